@@ -0,0 +1,137 @@
+"""
+Unique memory (USS) of forked workers without freezing, with `gc.freeze()`
+only and with `guard.freeze()`.
+
+Simulates a preload-and-fork server: the master builds the rules and warms
+up the caches, then forks workers that check imports of many callers and
+run a full garbage collection. Linux only (reads /proc/self/smaps_rollup).
+
+    python benchmarks/fork_memory.py [--workers 8] [--rules 5000]
+        [--adaptive 1000]
+"""
+
+import argparse
+import gc
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from import_guard import guard, mod  # noqa:E402
+from import_guard.models import CallerInfo  # noqa:E402
+
+
+def uss():
+    # private pages of the process, in kB
+    total = 0
+
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+
+    return total
+
+
+def build(rules, adaptive):
+    guard.set_deny_rules(
+        {
+            "app.module{}".format(i): [
+                "csv",
+                mod.top_level(mod.matches(r"app\.tasks\d+")),
+                mod.explicit(~mod(["logging", "json"])),
+            ]
+            for i in range(rules)
+        },
+        adaptive=adaptive or None,
+    )
+
+    # resolved module names of many files
+    for i in range(rules):
+        CallerInfo._names["/srv/app/module{}.py".format(i)] = (
+            "app.module{}".format(i)
+        )
+
+
+def work(rules):
+    for i in range(rules):
+        caller = "app.module{}.views".format(i)
+        guard.is_import_allowed("json", caller=caller)
+        guard.is_import_allowed("app.tasks1", caller=caller, top_level=False)
+        CallerInfo.get_module_name("/srv/app/module{}.py".format(i))
+
+    gc.collect()
+
+
+def run(workers, rules, adaptive, mode):
+    build(rules, adaptive)
+    # warm up caches in the master
+    work(rules)
+
+    if mode == "gc":
+        gc.freeze()
+    elif mode == "freeze":
+        guard.freeze()
+
+    read, write = os.pipe()
+    children = []
+
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            before = uss()
+            work(rules)
+            os.write(write, "{}\n".format(uss() - before).encode())
+            os._exit(0)
+
+        children.append(pid)
+
+    os.close(write)
+    for pid in children:
+        os.waitpid(pid, 0)
+
+    with os.fdopen(read) as f:
+        sizes = [int(x) for x in f.read().split()]
+
+    return sum(sizes) / len(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rules", type=int, default=5000)
+    parser.add_argument(
+        "--adaptive", type=int, default=0, help="warm-up of adaptive rules"
+    )
+    parser.add_argument("--mode", help="internal")
+    opts = parser.parse_args()
+
+    if opts.mode:
+        print(run(opts.workers, opts.rules, opts.adaptive, opts.mode))
+        return
+
+    # every mode runs in a fresh interpreter
+    results = {}
+    for mode in ["default", "gc", "freeze"]:
+        args = [sys.executable, __file__, "--mode", mode]
+        args += ["--workers", str(opts.workers), "--rules", str(opts.rules)]
+        args += ["--adaptive", str(opts.adaptive)]
+        results[mode] = float(subprocess.check_output(args))
+
+    print(
+        "workers: {}, rules: {}, adaptive: {}".format(
+            opts.workers, opts.rules, opts.adaptive
+        )
+    )
+    for mode, size in results.items():
+        print(
+            "{:>8}: {:8.0f} kB unique memory per worker".format(mode, size)
+        )
+
+
+if __name__ == "__main__":
+    main()
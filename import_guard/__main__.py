@@ -0,0 +1,277 @@
+"""
+Command line interface.
+
+    python -m import_guard run --rules rules.toml [--strict]
+        [--profile out.json]
+        [--memory out.json [--memory-tracing] [--memory-snapshots]]
+        [--locks out.json]
+        [--trace trace.log [--trace-format ndjson]
+            [--trace-modules pkg,...] [--trace-callers pkg,...]]
+        [--record-baseline edges.bin]
+        [--baseline edges.bin] (script.py | -m module) [args...]
+
+    python -X importtime app.py 2> import.log
+    python -m import_guard importtime --rules rules.toml [--json] import.log
+"""
+
+import argparse
+import atexit
+import json
+import os
+import runpy
+import sys
+from importlib.util import find_spec
+
+from ._guard import guard
+from .config import load_rules
+from .importtime import check
+from .models import CallerInfo
+
+
+def _split_target(argv):
+    """
+    Splits `run` arguments into own options and the target command line,
+    so options of the target are never interpreted by the parser.
+    """
+    options_with_value = {
+        "--rules",
+        "--profile",
+        "--memory",
+        "--locks",
+        "--trace",
+        "--trace-format",
+        "--trace-modules",
+        "--trace-callers",
+        "--baseline",
+        "--record-baseline",
+    }
+    i = 0
+
+    while i < len(argv):
+        arg = argv[i]
+
+        if arg == "-m":
+            if i + 1 == len(argv):
+                break
+            return argv[:i], argv[i + 1], True, argv[i + 2 :]
+
+        if not arg.startswith("-"):
+            return argv[:i], arg, False, argv[i + 1 :]
+
+        if arg in options_with_value:
+            i += 1
+
+        i += 1
+
+    return argv, None, False, []
+
+
+def _split_list(value):
+    return value.split(",") if value else None
+
+
+def _module_origin(module):
+    spec = find_spec(module)
+
+    if spec is None:
+        raise ImportError("No module named {}".format(module))
+
+    if spec.submodule_search_locations is not None:
+        # python -m package runs package.__main__
+        return _module_origin(module + ".__main__")
+
+    return spec.origin
+
+
+def run(argv):
+    options, target, is_module, args = _split_target(argv)
+
+    parser = argparse.ArgumentParser(
+        prog="python -m import_guard run",
+        usage="%(prog)s [options] (script.py | -m module) [args...]",
+    )
+    parser.add_argument("--rules", help="deny rules (.toml or .py)")
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="raise ForbiddenImportError instead of warning",
+    )
+    parser.add_argument(
+        "--profile", metavar="PATH", help="write import times as JSON"
+    )
+    parser.add_argument(
+        "--memory",
+        metavar="PATH",
+        help="write memory allocated by imports as JSON",
+    )
+    parser.add_argument(
+        "--memory-tracing",
+        action="store_true",
+        help="count memory allocated by Python using tracemalloc (slow)",
+    )
+    parser.add_argument(
+        "--memory-snapshots",
+        action="store_true",
+        help="include top allocation sites of every module (slower)",
+    )
+    parser.add_argument(
+        "--locks",
+        metavar="PATH",
+        help="write time imports waited for import locks as JSON",
+    )
+    parser.add_argument(
+        "--trace", metavar="PATH", help="write import trace to the file"
+    )
+    parser.add_argument(
+        "--trace-format", choices=["text", "ndjson"], default="text"
+    )
+    parser.add_argument(
+        "--trace-modules",
+        metavar="PACKAGES",
+        help="trace only imports of these packages (comma separated)",
+    )
+    parser.add_argument(
+        "--trace-callers",
+        metavar="PACKAGES",
+        help="trace only imports made by these packages (comma separated)",
+    )
+    parser.add_argument(
+        "--record-baseline",
+        metavar="PATH",
+        help="write import edges seen during the run",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="PATH",
+        help="skip rules for import edges recorded in the baseline",
+    )
+    opts = parser.parse_args(options)
+
+    if target is None:
+        parser.error("script or -m module is required")
+
+    if opts.rules:
+        guard.set_deny_rules(load_rules(opts.rules))
+
+    if opts.locks:
+        profiler = guard.profile_locks()
+        atexit.register(profiler.dump, opts.locks)
+
+    if opts.trace:
+        guard.trace(
+            opts.trace,
+            opts.trace_format,
+            _split_list(opts.trace_modules),
+            _split_list(opts.trace_callers),
+        )
+
+    if opts.record_baseline:
+        guard.record_baseline(opts.record_baseline)
+
+    if opts.baseline:
+        guard.use_baseline(opts.baseline)
+
+    if opts.profile:
+        profiler = guard.profile()
+        atexit.register(profiler.dump, opts.profile)
+
+    if opts.memory:
+        profiler = guard.profile_memory(
+            opts.memory_snapshots, opts.memory_tracing
+        )
+        # exit handlers run in reverse order: dump, then stop tracing
+        atexit.register(profiler.close)
+        atexit.register(profiler.dump, opts.memory)
+
+    # entrypoints are unknown until the module is found,
+    # but parent packages of the module must be guarded too
+    guard.enable(strict=opts.strict, entrypoints=[])
+
+    if is_module:
+        filename = _module_origin(target)
+    else:
+        filename = os.path.abspath(target)
+        sys.path[0] = os.path.dirname(filename)
+
+    guard.entrypoints.add(filename)
+    # runpy executes the target as a temporary `__main__` module
+    # that never shows up in the module cache
+    CallerInfo._names[filename] = "__main__"
+    sys.argv = [target] + args
+
+    if is_module:
+        runpy.run_module(target, run_name="__main__", alter_sys=True)
+    else:
+        runpy.run_path(filename, run_name="__main__")
+
+
+def importtime(argv):
+    parser = argparse.ArgumentParser(prog="python -m import_guard importtime")
+    parser.add_argument(
+        "--rules", required=True, help="deny rules (.toml or .py)"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the report as JSON"
+    )
+    parser.add_argument(
+        "log",
+        nargs="?",
+        default="-",
+        help="output of `python -X importtime` (stdin by default)",
+    )
+    opts = parser.parse_args(argv)
+    rules = load_rules(opts.rules)
+
+    if opts.log == "-":
+        report = check(sys.stdin, rules)
+    else:
+        with open(opts.log) as f:
+            report = check(f, rules)
+
+    if opts.json:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        for x in report["violations"]:
+            print(
+                "Importing `{}` from `{}` is not allowed [depth: {}] "
+                "({})".format(
+                    x["module"],
+                    x["caller"],
+                    x["depth"],
+                    " -> ".join(x["path"]),
+                )
+            )
+
+        if report["rules"]:
+            print("\n{:>12} {:>6}  rule".format("cumulative", "count"))
+
+        for x in report["rules"]:
+            print(
+                "{:>12} {:>6}  {}".format(
+                    "{}us".format(x["cumulative"]), x["count"], x["rule"]
+                )
+            )
+
+    return 1 if report["violations"] else 0
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    commands = {"run": run, "importtime": importtime}
+
+    if not argv or argv[0] not in commands:
+        sys.stderr.write(
+            "usage: python -m import_guard {{{}}} ...\n".format(
+                ",".join(sorted(commands))
+            )
+        )
+        return 2
+
+    return commands[argv[0]](argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
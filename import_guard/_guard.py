@@ -1,8 +1,18 @@
+import atexit
+import gc
 import inspect
+from collections import OrderedDict
 from functools import wraps
 
+from .baseline import Baseline, BaselineRecorder
 from .models import CallerInfo, ImportInfo
-from .observers import DefendingObserver, TracingObserver
+from .observers import (
+    DefendingObserver,
+    ImportLockObserver,
+    MemoryObserver,
+    ProfilingObserver,
+    TracingObserver,
+)
 
 
 def _get_import_function():
@@ -36,21 +46,92 @@ class _Guard:
     def __init__(self):
         self.strict = False
         self.entrypoints = None
-        self._observers = {}
+        self.boundaries = ()
+        self._observers = OrderedDict()
+        self._baseline = None
+        # called with (import_info, caller_info) for every violation
+        self.on_violation = None
 
     def register(self, observer):
         name = getattr(observer, "name", observer.__class__.__name__)
         self._observers[name] = observer
 
-    def trace(self):
-        self.register(TracingObserver())
+        # the lock observer measures the import itself, so it's notified
+        # right before the import starts and right after it ends
+        locks = self._observers.pop(ImportLockObserver.name, None)
+        if locks is not None:
+            self._observers[ImportLockObserver.name] = locks
+
+    def trace(self, output=None, format="text", modules=None, callers=None):
+        """
+        Traces imports to `output` (stdout by default) as indented text
+        or NDJSON, optionally only imports of (or made by) given packages.
+        """
+        self.register(TracingObserver(output, format, modules, callers))
 
     def notrace(self):
-        del self._observers[TracingObserver.name]
+        self._observers.pop(TracingObserver.name).close()
+
+    def profile(self):
+        profiler = ProfilingObserver()
+        self.register(profiler)
+        return profiler
+
+    def profile_memory(self, snapshots=False, tracing=False):
+        profiler = MemoryObserver(
+            snapshots, ruled_caller=self._ruled_caller, tracing=tracing
+        )
+        self.register(profiler)
+        return profiler
+
+    def profile_locks(self):
+        profiler = ImportLockObserver()
+        self.register(profiler)
+        return profiler
+
+    def record_baseline(self, path):
+        """
+        Records import edges seen until the interpreter exits into `path`,
+        except edges denied by the deny rules.
+        """
+        recorder = BaselineRecorder(self._find_violation)
+        self.register(recorder)
+        atexit.register(recorder.save, path)
+        return recorder
+
+    def use_baseline(self, path):
+        """
+        Skips rules (and all observers) for import edges from the baseline.
+        """
+        if self._baseline is not None:
+            self._baseline.close()
+
+        self._baseline = Baseline(path) if path is not None else None
+
+    def freeze(self):
+        """
+        Prepares the guard to be shared by forked worker processes
+        (e.g. `gunicorn --preload`). Call it in the master process
+        right before forking.
+
+        The warm-up of adaptive matchers is finished, so they are not
+        changed in workers, and all objects are moved to the permanent
+        GC generation (Python 3.7+), so garbage collections in workers
+        don't touch the shared pages.
+        """
+        defender = self._observers.get("defender")
+        if defender is not None:
+            defender.freeze()
 
-    def enable(self, strict=False, entrypoints=None):
+        if hasattr(gc, "freeze"):
+            gc.freeze()
+
+    def enable(self, strict=False, entrypoints=None, boundaries=None):
         # entrypoints limits stack unwinding. list of filenames
+        # boundaries stops unwinding before frames of files starting with
+        # the given prefixes (e.g. frames of a test runner)
         self.strict = strict
+        self.boundaries = tuple(boundaries or ())
 
         if entrypoints is None:
             entrypoints = [
@@ -63,8 +144,53 @@ class _Guard:
     def disable(self):
         _set_import_function(_original_import)
 
-    def set_deny_rules(self, rules):
-        self.register(DefendingObserver(rules))
+    def set_deny_rules(self, rules, adaptive=None):
+        """
+        `adaptive` is the number of warm-up evaluations after which
+        matchers reorder their children (see Matcher.adapt).
+        """
+        self.register(
+            DefendingObserver(rules, adaptive, self._report_violation)
+        )
+
+    def _report_violation(self, import_info, caller_info):
+        if self.on_violation is not None:
+            self.on_violation(import_info, caller_info)
+
+    def _find_violation(self, import_info, stack):
+        defender = self._observers.get("defender")
+
+        if defender is not None:
+            return defender.find_violation(import_info, stack)
+
+    def _ruled_caller(self, stack):
+        # rules may be set after the profiler
+        defender = self._observers.get("defender")
+
+        if defender is not None:
+            return defender.find_ruled_caller(stack)
+
+    def add_rules(self, rules):
+        defender = self._observers.get("defender")
+
+        if defender is None:
+            self.set_deny_rules(rules)
+        else:
+            defender.add_rules(rules)
+
+    def remove_rules(self, callers):
+        defender = self._observers.get("defender")
+
+        if defender is not None:
+            defender.remove_rules(callers)
+
+    def replace_rule(self, caller, matcher):
+        defender = self._observers.get("defender")
+
+        if defender is None:
+            self.set_deny_rules({caller: matcher})
+        else:
+            defender.replace_rule(caller, matcher)
 
     def is_import_allowed(
         self, imported_module, caller="<stdin>", top_level=True
@@ -82,6 +208,67 @@ class _Guard:
 
         return defender.is_import_allowed(imported_module, caller)
 
+    def check_many(self, pairs, top_level=True, processes=None):
+        """
+        Checks many (imported_module, caller) pairs at once.
+
+        Pairs are grouped by caller and deduplicated, so the rules
+        of every caller are looked up only once. Returns a bytearray
+        with 1 for allowed and 0 for denied imports, in order of pairs.
+
+        `processes` splits the groups across a process pool
+        (rules must be picklable).
+        """
+        pairs = list(pairs)
+        result = bytearray(b"\x01") * len(pairs)
+        defender = self._observers.get("defender")
+
+        if not defender:
+            return result
+
+        # caller -> (caller_info, imports, {import key: index}, [pairs])
+        groups = {}
+
+        for i, (imported_module, caller) in enumerate(pairs):
+            group = groups.get(caller)
+
+            if group is None:
+                caller_info = caller
+                if isinstance(caller, str):
+                    caller_info = CallerInfo.from_string(caller, top_level)
+
+                group = groups[caller] = (caller_info, [], {}, [])
+
+            _, imports, index, positions = group
+            key = _import_key(imported_module)
+            j = index.get(key)
+
+            if j is None:
+                if isinstance(imported_module, str):
+                    imported_module = ImportInfo.from_string(imported_module)
+
+                j = index[key] = len(imports)
+                imports.append(imported_module)
+                positions.append([])
+
+            positions[j].append(i)
+
+        groups = list(groups.values())
+        tasks = [(group[0], group[1]) for group in groups]
+
+        if processes is None:
+            flags = [defender.check_group(*task) for task in tasks]
+        else:
+            flags = _check_groups_in_pool(defender, tasks, processes)
+
+        for (_, _, _, positions), group_flags in zip(groups, flags):
+            for j, allowed in enumerate(group_flags):
+                if not allowed:
+                    for i in positions[j]:
+                        result[i] = 0
+
+        return result
+
     @wraps(_original_import)
     def _import_hook(
         self, name, globals_=None, locals_=None, fromlist=(), level=0
@@ -93,18 +280,79 @@ class _Guard:
         parent_frame = inspect.currentframe().f_back
 
         full_name = ImportInfo.get_full_module_name(name, globals_, level)
+
+        baseline = self._baseline
+        if baseline is not None:
+            edge = CallerInfo.edge(
+                parent_frame, self.entrypoints, self.boundaries
+            )
+
+            if edge is not None and (edge + (full_name,)) in baseline:
+                return _original_import(
+                    name, globals_, locals_, fromlist, level
+                )
+
         import_info = ImportInfo(full_name, fromlist or [], level)
 
-        stack = CallerInfo.stack(parent_frame, self.entrypoints)
+        stack = CallerInfo.stack(
+            parent_frame, self.entrypoints, self.boundaries
+        )
+
+        # only observers that have seen the beginning of the import
+        # are notified about its end (strict mode raises in the middle),
+        # in reverse order
+        started = []
 
         try:
-            for observer in self._observers.values():
+            for observer in list(self._observers.values()):
                 observer.on_import_begin(import_info, stack, self.strict)
+                started.append(observer)
 
             return _original_import(name, globals_, locals_, fromlist, level)
         finally:
-            for observer in self._observers.values():
+            for observer in reversed(started):
                 observer.on_import_end(import_info, stack, self.strict)
 
 
+def _import_key(imported_module):
+    if isinstance(imported_module, str):
+        return imported_module
+
+    from_list = imported_module.from_list
+    return (
+        imported_module.module_name,
+        tuple(from_list) if from_list else None,
+        imported_module.level,
+    )
+
+
+_worker_defender = None
+
+
+def _init_worker(defender):
+    global _worker_defender
+    _worker_defender = defender
+
+
+def _check_groups(tasks):
+    return [_worker_defender.check_group(*task) for task in tasks]
+
+
+def _check_groups_in_pool(defender, tasks, processes):
+    from multiprocessing import Pool
+
+    chunks = processes * 4
+    size = len(tasks) // chunks + 1
+    chunked = [tasks[i : i + size] for i in range(0, len(tasks), size)]
+
+    pool = Pool(processes, _init_worker, (defender,))
+    try:
+        results = pool.map(_check_groups, chunked)
+    finally:
+        pool.close()
+        pool.join()
+
+    return [flags for chunk in results for flags in chunk]
+
+
 guard = _Guard()
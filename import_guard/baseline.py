@@ -0,0 +1,135 @@
+"""
+Baseline of known import edges.
+
+An edge is (caller module, is lazy, imported module) of the innermost caller.
+Edges recorded during a full test run are written to a compact file:
+
+    header | sorted module names ("\\n"-joined) | padding | sorted edges
+
+where every edge is a single uint64 key built from the indices of
+the module names. The file is memory-mapped, so a membership test is
+a binary search without loading the edges into memory.
+"""
+
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
+
+from .observers import Observer
+
+
+__all__ = ["Baseline", "BaselineRecorder", "write_baseline"]
+
+_magic = b"IGBASE1\n"
+_header = struct.Struct("=8sII")
+
+
+def _key(caller_id, is_lazy, imported_id):
+    return (caller_id << 33) | (bool(is_lazy) << 32) | imported_id
+
+
+def write_baseline(path, edges):
+    strings = sorted(
+        {x for caller, _, imported in edges for x in (caller, imported)}
+    )
+    ids = {name: i for i, name in enumerate(strings)}
+
+    keys = array(
+        "Q",
+        sorted(
+            _key(ids[caller], is_lazy, ids[imported])
+            for caller, is_lazy, imported in edges
+        ),
+    )
+    block = "\n".join(strings).encode("utf-8")
+    padding = -(_header.size + len(block)) % keys.itemsize
+
+    with open(path, "wb") as f:
+        f.write(_header.pack(_magic, len(block), len(keys)))
+        f.write(block)
+        f.write(b"\0" * padding)
+        keys.tofile(f)
+
+
+class Baseline(object):
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, size, count = _header.unpack_from(self._mmap)
+        if magic != _magic:
+            self._mmap.close()
+            raise ValueError("{} is not a baseline file".format(path))
+
+        offset = _header.size
+        block = self._mmap[offset : offset + size].decode("utf-8")
+        names = block.split("\n") if block else []
+        self._ids = {name: i for i, name in enumerate(names)}
+
+        offset += size + (-(offset + size) % 8)
+        view = memoryview(self._mmap)[offset : offset + count * 8]
+        self._edges = view.cast("Q")
+        # edges that were already found
+        self._known = set()
+
+    def __len__(self):
+        return len(self._edges)
+
+    def __contains__(self, edge):
+        if edge in self._known:
+            return True
+
+        caller, is_lazy, imported = edge
+        ids = self._ids
+
+        if caller not in ids or imported not in ids:
+            return False
+
+        key = _key(ids[caller], is_lazy, ids[imported])
+        edges = self._edges
+        i = bisect_left(edges, key)
+
+        if i != len(edges) and edges[i] == key:
+            self._known.add(edge)
+            return True
+
+        return False
+
+    def close(self):
+        self._edges.release()
+        self._mmap.close()
+
+
+class BaselineRecorder(Observer):
+    """
+    Records import edges. Edges rejected by `find_violation` (e.g. by
+    the current deny rules) are not recorded, so they are never skipped.
+    """
+
+    name = "baseline_recorder"
+
+    def __init__(self, find_violation=None):
+        self.edges = set()
+        self.find_violation = find_violation
+
+    def on_import_begin(self, import_info, stack, strict):
+        if not stack:
+            return
+
+        if self.find_violation is not None and (
+            self.find_violation(import_info, stack) is not None
+        ):
+            return
+
+        caller_info = stack[-1]
+        self.edges.add(
+            (
+                caller_info.module_name,
+                caller_info.is_lazy(),
+                import_info.module_name,
+            )
+        )
+
+    def save(self, path):
+        write_baseline(path, self.edges)
@@ -0,0 +1,74 @@
+"""Load deny rules from configuration files."""
+
+import runpy
+
+from .matchers import mod
+
+
+try:
+    import tomllib as toml
+except ImportError:  # pragma: no cover
+    try:
+        import tomli as toml
+    except ImportError:
+        toml = None
+
+
+__all__ = ["load_rules", "parse_rule"]
+
+
+# one-key tables in TOML files map onto the `mod` helpers:
+#   {matches = "log.*"}, {top_level = "csv"}, {not = ["json"]}, ...
+_helpers = {
+    "any": lambda value: mod.any([parse_rule(x) for x in value]),
+    "all": lambda value: mod.all([parse_rule(x) for x in value]),
+    "not": lambda value: ~parse_rule(value),
+    "matches": lambda value: mod.matches(value),
+    "explicit": lambda value: mod.explicit(parse_rule(value)),
+    "top_level": lambda value: mod.top_level(parse_rule(value)),
+    "star": lambda value: mod.star(parse_rule(value)),
+}
+
+
+def parse_rule(value):
+    """
+    Converts a plain data structure (as read from TOML) into a matcher.
+    """
+    if isinstance(value, str):
+        return mod(value)
+
+    if isinstance(value, list):
+        return mod.any([parse_rule(x) for x in value])
+
+    if isinstance(value, dict):
+        value = dict(value)
+
+        if "depth" in value:
+            depth = value.pop("depth")
+            return mod.depth(depth, parse_rule(value.pop("module", value)))
+
+        if len(value) == 1:
+            (key, arg), = value.items()
+            if key in _helpers:
+                return _helpers[key](arg)
+
+    raise ValueError("Invalid rule: {!r}".format(value))
+
+
+def load_rules(path):
+    """
+    Reads deny rules from a `.toml` file (the `[rules]` table)
+    or from a `.py` file (the `rules` variable).
+    """
+    if path.endswith(".py"):
+        return runpy.run_path(path)["rules"]
+
+    if toml is None:
+        raise ImportError(
+            "Reading {} requires Python 3.11+ or `tomli`".format(path)
+        )
+
+    with open(path, "rb") as f:
+        config = toml.load(f)
+
+    return {k: parse_rule(v) for k, v in config.get("rules", {}).items()}
@@ -0,0 +1,148 @@
+"""
+Offline rule evaluation over `python -X importtime` logs.
+
+The log lists every module the first time it is imported, children
+before their parent, with the nesting encoded in the indentation:
+
+    import time: self [us] | cumulative | imported package
+    import time:        88 |         88 |     _sre
+    import time:       668 |       8926 |   re
+    import time:       536 |       9746 | csv
+
+Nested imports are replayed as top-level imports made by the parent module,
+so `depth` is the number of modules between the caller and the import
+(not the number of frames, as in runtime).
+"""
+
+from collections import namedtuple
+
+from .models import CallerInfo, ImportInfo
+from .observers import DefendingObserver
+
+
+__all__ = ["ImportRecord", "iter_imports", "check"]
+
+_prefix = "import time:"
+
+ImportRecord = namedtuple(
+    "ImportRecord", ["import_info", "stack", "self", "cumulative"]
+)
+
+
+def _parse_line(line):
+    if not line.startswith(_prefix):
+        return None
+
+    parts = line[len(_prefix) :].split("|")
+    if len(parts) != 3:
+        return None
+
+    try:
+        self_us, cumulative = int(parts[0]), int(parts[1])
+    except ValueError:
+        # header
+        return None
+
+    name = parts[2].rstrip("\r\n")[1:]
+    indent = len(name) - len(name.lstrip(" "))
+
+    return indent // 2, name[indent:], self_us, cumulative
+
+
+def _walk(root, main):
+    # pre-order traversal, so records come in the order of import statements
+    pending = [(root, (main,))]
+
+    while pending:
+        (name, self_us, cumulative, children), chain = pending.pop()
+        size = len(chain)
+        stack = [
+            CallerInfo(caller, "<module>", "<importtime>", 0, size - i - 1)
+            for i, caller in enumerate(chain)
+        ]
+
+        yield ImportRecord(ImportInfo(name, [], 0), stack, self_us, cumulative)
+
+        chain += (name,)
+        pending.extend((child, chain) for child in reversed(children))
+
+
+def iter_imports(lines, main="__main__"):
+    """
+    Streams ImportRecord for every import found in the log.
+    Modules imported by the entrypoint are attributed to `main`.
+    Lines that don't belong to the log are ignored.
+    """
+    # level -> finished subtrees waiting for their parent
+    children = {}
+
+    for line in lines:
+        parsed = _parse_line(line)
+        if parsed is None:
+            continue
+
+        level, name, self_us, cumulative = parsed
+        node = (name, self_us, cumulative, children.pop(level + 1, []))
+
+        if level:
+            children.setdefault(level, []).append(node)
+            continue
+
+        for record in _walk(node, main):
+            yield record
+
+
+def check(lines, rules, main="__main__"):
+    """
+    Evaluates deny rules against the log.
+
+    Returns a report with violations and the cumulative import time
+    of violating imports per rule (nested violations of the same rule
+    are not counted twice).
+    """
+    defender = DefendingObserver(rules)
+    violations = []
+    costs = {}
+    # rules charged by the ancestors of the current import
+    charged = {}
+
+    for record in iter_imports(lines, main):
+        import_info = record.import_info
+        path = [x.module_name for x in record.stack[1:]]
+
+        if not path:
+            charged.clear()
+
+        ancestors = charged.get(tuple(path), ())
+
+        violation = defender.find_violation(import_info, record.stack)
+
+        if violation is not None:
+            caller_info, rule = violation
+            violations.append(
+                {
+                    "module": import_info.module_name,
+                    "caller": caller_info.module_name,
+                    "rule": rule,
+                    "depth": caller_info.depth,
+                    "path": path + [import_info.module_name],
+                    "cumulative": record.cumulative,
+                }
+            )
+
+            if rule not in ancestors:
+                stats = costs.setdefault(rule, [0, 0])
+                stats[0] += 1
+                stats[1] += record.cumulative
+                ancestors += (rule,)
+
+        if ancestors:
+            charged[tuple(path) + (import_info.module_name,)] = ancestors
+
+    rules_report = [
+        {"rule": rule, "count": count, "cumulative": cumulative}
+        for rule, (count, cumulative) in costs.items()
+    ]
+    rules_report.sort(key=lambda x: x["cumulative"], reverse=True)
+
+    return {"unit": "us", "violations": violations, "rules": rules_report}
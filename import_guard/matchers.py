@@ -1,4 +1,10 @@
 import re
+import threading
+
+try:
+    from time import perf_counter
+except ImportError:  # Python 2
+    from timeit import default_timer as perf_counter
 
 from .models import CallerInfo, ImportInfo
 
@@ -19,10 +25,33 @@ def wrap(obj):
     raise TypeError
 
 
+# children are reordered once per warm-up, even if many threads
+# finish it at the same time (module level, so matchers stay picklable)
+_reorder_lock = threading.Lock()
+
+
 class Matcher:
+    # pure matchers have no side effects, so they can be evaluated
+    # in any order (see MultiMatcher.adapt)
+    pure = True
+
     def matches(self, import_info, caller_info):
         raise NotImplementedError
 
+    def adapt(self, warmup=1000):
+        return self
+
+    def freeze(self):
+        return self
+
+    def select(self, imports, caller_info, indices):
+        """
+        Returns indices (a subset of `indices`, in the same order)
+        of imports matched for the same caller.
+        """
+        matches = self.matches
+        return [i for i in indices if matches(imports[i], caller_info)]
+
     def test(self, imported_module, caller="<stdin>", top_level=True):
         if isinstance(caller, str):
             caller = CallerInfo.from_string(caller, top_level)
@@ -43,17 +72,137 @@ class Matcher:
 
 
 class MultiMatcher(Matcher):
+    # result of a child that decides the result of the whole matcher
+    _decisive = None
+
     def __init__(self, matchers):
         self.matchers = [wrap(x) for x in matchers]
+        # (children, [[evaluations, hits, time] per child]) during the
+        # warm-up. Evaluations take it once, so they never mix children
+        # and statistics of different orders.
+        self._stats = None
+        self._warmup = 0
+
+    @property
+    def pure(self):
+        return all(x.pure for x in self.matchers)
+
+    def adapt(self, warmup=1000):
+        """
+        Collects hit rates and evaluation time of children during
+        the next `warmup` evaluations and then reorders children
+        to minimize the expected cost. Impure children keep their
+        positions relative to the others.
+        """
+        for matcher in self.matchers:
+            matcher.adapt(warmup)
+
+        self._warmup = warmup
+        self._stats = (self.matchers, [[0, 0, 0.0] for _ in self.matchers])
+        return self
+
+    def freeze(self):
+        """
+        Finishes the warm-up and makes children immutable,
+        so evaluation never writes to the matcher.
+        """
+        for matcher in self.matchers:
+            matcher.freeze()
+
+        state = self._stats
+        if state is not None:
+            self._reorder(state)
+
+        self.matchers = tuple(self.matchers)
+        return self
+
+    def _observe(self, state, args):
+        decided = False
+
+        # short-circuit as usual: children after the decisive one
+        # may not expect such arguments (or may be slow).
+        # Concurrent updates of statistics may be lost, it's fine
+        for matcher, stat in zip(*state):
+            start = perf_counter()
+            result = bool(matcher.matches(*args))
+            stat[2] += perf_counter() - start
+            stat[0] += 1
+            stat[1] += result
+
+            if result is self._decisive:
+                decided = True
+                break
+
+        self._warmup -= 1
+        if self._warmup <= 0:
+            self._reorder(state)
+
+        return decided == self._decisive
+
+    def _reorder(self, state):
+        with _reorder_lock:
+            # already reordered by another thread
+            if self._stats is not state:
+                return
+
+            self.matchers = self._ordered(*state)
+            # the new order is visible before the warm-up ends
+            self._stats = None
+
+    def _ordered(self, matchers, stats):
+        ordered = []
+        pure = []
+
+        for matcher, stat in zip(matchers, stats):
+            if matcher.pure:
+                pure.append((matcher, stat))
+                continue
+
+            ordered.extend(sorted(pure, key=self._expected_cost))
+            ordered.append((matcher, stat))
+            pure = []
+
+        ordered.extend(sorted(pure, key=self._expected_cost))
+        return [matcher for matcher, _ in ordered]
+
+    def _expected_cost(self, item):
+        # cost per decision: children that cheaply decide go first.
+        # Statistics of a child only cover evaluations where previous
+        # children didn't decide, so its decision rate is conditional;
+        # children that never ran (or never decided) keep their order
+        # after the others.
+        evaluations, hits, time = item[1]
+        decisions = hits if self._decisive else evaluations - hits
+
+        if not decisions:
+            return float("inf")
+
+        return time / decisions
 
 
 class Invert(Matcher):
     def __init__(self, obj):
         self.matcher = wrap(obj)
 
+    @property
+    def pure(self):
+        return self.matcher.pure
+
+    def adapt(self, warmup=1000):
+        self.matcher.adapt(warmup)
+        return self
+
+    def freeze(self):
+        self.matcher.freeze()
+        return self
+
     def matches(self, *args):
         return not self.matcher.matches(*args)
 
+    def select(self, imports, caller_info, indices):
+        matched = set(self.matcher.select(imports, caller_info, indices))
+        return [i for i in indices if i not in matched]
+
     def __repr__(self):
         return "(not {})".format(repr(self.matcher))
 
@@ -65,6 +214,10 @@ class Exact(Matcher):
     def matches(self, import_info, caller_info):
         return self.module_name == import_info.module_name
 
+    def select(self, imports, caller_info, indices):
+        name = self.module_name
+        return [i for i in indices if imports[i].module_name == name]
+
     def __repr__(self):
         return "'{}'".format(self.module_name)
 
@@ -79,6 +232,10 @@ class Regex(Matcher):
     def matches(self, import_info, caller_info):
         return bool(self.pattern.match(import_info.module_name))
 
+    def select(self, imports, caller_info, indices):
+        match = self.pattern.match
+        return [i for i in indices if match(imports[i].module_name)]
+
     def __repr__(self):
         return "re('{}')".format(self.pattern.pattern)
 
@@ -87,13 +244,16 @@ class TopLevel(Matcher):
     def matches(self, import_info, caller_info):
         return not caller_info.is_lazy()
 
+    def select(self, imports, caller_info, indices):
+        return [] if caller_info.is_lazy() else indices
+
     def __repr__(self):
         return "TopLevel"
 
 
 class StarImport(Matcher):
     def matches(self, import_info, caller_info):
-        return "*" in import_info.from_list
+        return "*" in (import_info.from_list or ())
 
     def __repr__(self):
         return "Star"
@@ -106,32 +266,72 @@ class Depth(Matcher):
     def matches(self, import_info, caller_info):
         return caller_info.depth <= self.max_depth
 
+    def select(self, imports, caller_info, indices):
+        return indices if caller_info.depth <= self.max_depth else []
+
     def __repr__(self):
         return "Depth({})".format(self.max_depth)
 
 
 class Any(MultiMatcher):
+    _decisive = True
+
     def matches(self, *args):
+        state = self._stats
+        if state is not None:
+            return self._observe(state, args)
+
         return any(x.matches(*args) for x in self.matchers)
 
+    def select(self, imports, caller_info, indices):
+        remaining = indices
+        matched = set()
+
+        for matcher in self.matchers:
+            if not remaining:
+                break
+
+            selected = matcher.select(imports, caller_info, remaining)
+            if selected:
+                matched.update(selected)
+                remaining = [i for i in remaining if i not in matched]
+
+        return [i for i in indices if i in matched]
+
     def __repr__(self):
         return "({})".format(" | ".join(map(repr, self.matchers)))
 
 
 class All(MultiMatcher):
+    _decisive = False
+
     def matches(self, *args):
+        state = self._stats
+        if state is not None:
+            return self._observe(state, args)
+
         return all(x.matches(*args) for x in self.matchers)
 
+    def select(self, imports, caller_info, indices):
+        for matcher in self.matchers:
+            if not indices:
+                break
+
+            indices = matcher.select(imports, caller_info, indices)
+
+        return indices
+
     def __repr__(self):
         return "({})".format(" & ".join(map(repr, self.matchers)))
 
 
 class Hook(Matcher):
-    def __init__(self, func):
+    def __init__(self, func, pure=False):
         if not callable(func):
             raise TypeError("must be callable")
 
         self.func = func
+        self.pure = pure
 
     def matches(self, import_info, caller_info):
         return self.func(import_info, caller_info)
@@ -157,8 +357,8 @@ class ModuleMatcherHelpers:
     def star(self, matcher):
         return All([StarImport(), self(matcher)])
 
-    def hook(self, func):
-        return Hook(func)
+    def hook(self, func, pure=False):
+        return Hook(func, pure)
 
     # def not_std(self):
     #     # TODO
@@ -1,21 +1,36 @@
+import importlib
+import os
 from collections import namedtuple
 from sys import modules as sys_modules
 
 
+try:
+    from importlib.machinery import PathFinder
+except ImportError:  # Python 2
+    PathFinder = None
+
+
 __all__ = ["ImportInfo", "CallerInfo"]
 
 
-def iter_stack(frame, entrypoints):
+def iter_stack(frame, entrypoints, boundaries=()):
+    # entrypoints are the last frames of the stack,
+    # unwinding stops right before frames of boundaries (path prefixes)
     while frame:
         filename = frame.f_code.co_filename
 
         if (
             filename.startswith("<frozen importlib")
+            # importlib.import_module
+            or filename == importlib.__file__
             or "import_guard/" in filename
         ):
             frame = frame.f_back
             continue
 
+        if boundaries and filename.startswith(boundaries):
+            break
+
         yield frame
 
         if filename in entrypoints:
@@ -24,6 +39,33 @@ def iter_stack(frame, entrypoints):
         frame = frame.f_back
 
 
+def find_spec(module_name):
+    """
+    Finds the spec of a module without importing it or its parents.
+    """
+    if not hasattr(PathFinder, "find_spec"):  # Python < 3.4
+        return None
+
+    module = sys_modules.get(module_name)
+    if module is not None:
+        return getattr(module, "__spec__", None)
+
+    parent = module_name.rpartition(".")[0]
+    path = None
+
+    if parent:
+        spec = find_spec(parent)
+        if spec is None or not spec.submodule_search_locations:
+            return None
+
+        path = list(spec.submodule_search_locations)
+
+    try:
+        return PathFinder.find_spec(module_name, path)
+    except (ImportError, ValueError):
+        return None
+
+
 class ImportInfo(
     namedtuple(
         "_ImportInfo",
@@ -84,6 +126,12 @@ class CallerInfo(
 ):
     _module_cache = {}
     _module_cache_keys = set()
+    # directory of a ruled package -> package name
+    _package_dirs = {}
+    # file of a ruled module -> module name
+    _module_files = {}
+    # filename -> module name (or filename if it can't be resolved)
+    _names = {}
 
     @classmethod
     def from_frame(cls, frame, depth=0, _is_lazy=False):
@@ -91,7 +139,7 @@ class CallerInfo(
         co_name = frame.f_code.co_name
 
         return cls(
-            cls._get_module_name_by_filename(filename),
+            cls.get_module_name(filename),
             co_name if not _is_lazy else "<lazy {}>".format(co_name),
             filename,
             frame.f_lineno,
@@ -109,13 +157,12 @@ class CallerInfo(
         )
 
     @classmethod
-    def stack(cls, initial_frame, entrypoints):
+    def stack(cls, initial_frame, entrypoints, boundaries=()):
         is_lazy = False
         stack = []
+        frames = iter_stack(initial_frame, entrypoints, boundaries)
 
-        for depth, frame in reversed(
-            list(enumerate(iter_stack(initial_frame, entrypoints)))
-        ):
+        for depth, frame in reversed(list(enumerate(frames))):
             info = CallerInfo.from_frame(frame, depth, is_lazy)
 
             if not is_lazy:
@@ -125,9 +172,92 @@ class CallerInfo(
 
         return stack
 
+    @classmethod
+    def edge(cls, initial_frame, entrypoints, boundaries=()):
+        """
+        Returns (module_name, is_lazy) of the last element of `stack`
+        without building the whole stack.
+        """
+        frames = iter_stack(initial_frame, entrypoints, boundaries)
+        frame = next(frames, None)
+
+        if frame is None:
+            return None
+
+        filename = frame.f_code.co_filename
+        is_lazy = frame.f_code.co_name != "<module>" or any(
+            x.f_code.co_name != "<module>" for x in frames
+        )
+
+        return cls.get_module_name(filename), is_lazy
+
     def is_lazy(self):
         return self.function != "<module>"
 
+    @classmethod
+    def register_prefixes(cls, module_names):
+        """
+        Resolves ruled modules to their location on disk (without
+        importing them), so frames of files under these locations
+        are resolved to module names by path.
+        """
+        for name in module_names:
+            spec = find_spec(name)
+            if spec is None:
+                continue
+
+            if spec.submodule_search_locations:
+                for directory in spec.submodule_search_locations:
+                    cls._package_dirs[directory] = name
+            elif spec.has_location:
+                cls._module_files[spec.origin] = name
+
+        # only unresolved filenames can be affected
+        names = cls._names
+        for filename, name in list(names.items()):
+            if filename == name:
+                del names[filename]
+
+    @classmethod
+    def get_module_name(cls, filename):
+        name = cls._names.get(filename)
+
+        if name is None:
+            name = cls._get_module_name_by_path(filename)
+
+            if name is None:
+                name = cls._get_module_name_by_filename(filename)
+
+            cls._names[filename] = name
+
+        return name
+
+    @classmethod
+    def _get_module_name_by_path(cls, filename):
+        name = cls._module_files.get(filename)
+        if name is not None:
+            return name
+
+        directory, basename = os.path.split(filename)
+        module, ext = os.path.splitext(basename)
+
+        if ext != ".py":
+            return None
+
+        # the deepest ruled package containing the file
+        parts = [] if module == "__init__" else [module]
+        package_dirs = cls._package_dirs
+
+        while directory not in package_dirs:
+            directory, part = os.path.split(directory)
+            if not part:
+                return None
+
+            parts.append(part)
+
+        parts.append(package_dirs[directory])
+        return ".".join(reversed(parts))
+
     @classmethod
     def _get_module_name_by_filename(cls, filename):
         cache = cls._module_cache
@@ -1,6 +1,18 @@
+import atexit
+import json
+import os
+import sys
+import threading
 import warnings
+from json.encoder import encode_basestring
+
+try:
+    from time import perf_counter
+except ImportError:  # Python 2
+    from timeit import default_timer as perf_counter
 
 from .matchers import mod
+from .models import CallerInfo
 from .trie import Trie
 
 
@@ -20,48 +32,264 @@ class Observer(object):
         pass
 
 
+def _prefixes(names):
+    # matches the given modules and their submodules
+    if not names:
+        return None
+
+    return frozenset(names), tuple(x + "." for x in names)
+
+
+def _matches_prefixes(name, prefixes):
+    exact, submodules = prefixes
+    return name in exact or name.startswith(submodules)
+
+
 class TracingObserver(Observer):
+    """
+    Writes a record at the beginning and at the end of every import:
+
+        text:   "<time, us>   <indent> > <module>[ (lazy)]"
+        ndjson: {"t": <time, us>, "event": "begin", "module": ...,
+                 "caller": ..., "lazy": false, "depth": 0}
+
+    `output` is a file object (stdout by default) or a path. Records are
+    buffered and written every `buffer_size` records and at exit.
+    `modules` and `callers` limit tracing to imports of (or made by)
+    the given packages; other imports are skipped before formatting.
+    """
+
     name = "tracer"
 
-    def __init__(self):
-        self.depth = 0
+    def __init__(
+        self,
+        output=None,
+        format="text",
+        modules=None,
+        callers=None,
+        buffer_size=1000,
+    ):
+        if format not in ("text", "ndjson"):
+            raise ValueError("Unknown trace format: {}".format(format))
 
-    def on_import_begin(self, import_info, stack, strict):
-        print(
-            "{indent} > {module_name}{is_lazy}".format(
-                indent="  " * self.depth,
-                module_name=import_info.module_name,
-                is_lazy=" (lazy)" if stack[-1].is_lazy() else "",
-            )
+        self._owns_output = isinstance(output, str)
+        if self._owns_output:
+            output = open(output, "w", buffering=1 << 16)
+
+        self.output = sys.stdout if output is None else output
+        self._format = (
+            self._format_text if format == "text" else self._format_ndjson
         )
-        self.depth += 1
+        self._modules = _prefixes(modules)
+        self._callers = _prefixes(callers)
+        self._buffer = []
+        self._buffer_size = buffer_size
+        # the buffer is shared by all threads; reentrant, since writing
+        # to the output may import modules (e.g. encodings)
+        self._lock = threading.RLock()
+        self._start = perf_counter()
+        self._local = threading.local()
+        atexit.register(self.flush)
 
-    def on_import_end(self, import_info, stack, strict):
-        self.depth -= 1
-        print(
-            "{indent} < {module_name}{is_lazy}".format(
-                indent="  " * self.depth,
-                module_name=import_info.module_name,
-                is_lazy=" (lazy)" if stack[-1].is_lazy() else "",
+    def _is_traced(self, import_info, stack):
+        if self._modules is not None and not _matches_prefixes(
+            import_info.module_name, self._modules
+        ):
+            return False
+
+        if self._callers is not None and not (
+            stack and _matches_prefixes(stack[-1].module_name, self._callers)
+        ):
+            return False
+
+        return True
+
+    def _format_text(self, event, import_info, caller_info, depth, time):
+        return "%10d %s %s %s%s\n" % (
+            time,
+            "  " * depth,
+            ">" if event == "begin" else "<",
+            import_info.module_name,
+            " (lazy)" if caller_info and caller_info.is_lazy() else "",
+        )
+
+    def _format_ndjson(self, event, import_info, caller_info, depth, time):
+        return (
+            '{"t": %d, "event": "%s", "module": %s, "caller": %s, '
+            '"lazy": %s, "depth": %d}\n'
+            % (
+                time,
+                event,
+                encode_basestring(import_info.module_name),
+                encode_basestring(caller_info.module_name)
+                if caller_info
+                else "null",
+                "true" if caller_info and caller_info.is_lazy() else "false",
+                depth,
             )
         )
 
+    def _write(self, event, import_info, stack, depth):
+        time = (perf_counter() - self._start) * 1e6
+        caller_info = stack[-1] if stack else None
+        record = self._format(event, import_info, caller_info, depth, time)
+
+        with self._lock:
+            self._buffer.append(record)
+
+            if len(self._buffer) >= self._buffer_size:
+                self.flush()
+
+    def on_import_begin(self, import_info, stack, strict):
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            pending = self._local.pending = []
+
+        traced = self._is_traced(import_info, stack)
+        if traced:
+            self._write("begin", import_info, stack, len(pending))
+
+        pending.append(traced)
+
+    def on_import_end(self, import_info, stack, strict):
+        pending = self._local.pending
+        if pending.pop():
+            self._write("end", import_info, stack, len(pending))
+
+    def flush(self):
+        with self._lock:
+            buffer, self._buffer = self._buffer, []
+
+            if buffer:
+                self.output.write("".join(buffer))
+                self.output.flush()
+
+    def close(self):
+        self.flush()
+        if hasattr(atexit, "unregister"):  # Python 2 has no unregister
+            atexit.unregister(self.flush)
+
+        if self._owns_output:
+            self.output.close()
+
 
 class DefendingObserver(Observer):
     name = "defender"
 
-    def __init__(self, rules):
+    def __init__(self, rules, adaptive=None, on_violation=None):
+        # number of warm-up evaluations for adaptive matchers
+        self._adaptive = adaptive
+        # called with (import_info, caller_info) for every violation,
+        # including repeated ones
+        self.on_violation = on_violation
         self._rules = Trie()
-        self._rules.update({k: mod(v) for k, v in rules.items()})
+        self._rules.update({k: self._prepare(v) for k, v in rules.items()})
+        CallerInfo.register_prefixes(rules)
         self._seen_modules = set()
+        # caller -> ((rule, matcher), ...) along the trie path
+        self._matchers = {}
+        self._lock = threading.RLock()
+        # incremented on every rules update
+        self.version = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_matchers"] = {}
+        state["on_violation"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def add_rules(self, rules):
+        """
+        Adds rules to the live trie. A rule for a caller that already
+        has one is combined with it (denied if any of them matches).
+        """
+        rules = {k: self._prepare(v) for k, v in rules.items()}
+
+        with self._lock:
+            for caller, matcher in rules.items():
+                node = self._rules.find(caller)
+                if node is not None:
+                    matcher = self._prepare(node.data | matcher)
+
+                self._rules.insert(caller, matcher)
+
+            self._invalidate(rules)
+
+        CallerInfo.register_prefixes(rules)
+
+    def remove_rules(self, callers):
+        with self._lock:
+            for caller in callers:
+                self._rules.remove(caller)
+
+            self._invalidate(callers)
+
+    def replace_rule(self, caller, matcher):
+        matcher = self._prepare(matcher)
+
+        with self._lock:
+            self._rules.insert(caller, matcher)
+            self._invalidate([caller])
+
+        CallerInfo.register_prefixes([caller])
+
+    def _prepare(self, rule):
+        matcher = mod(rule)
+
+        if self._adaptive:
+            matcher.adapt(self._adaptive)
+
+        return matcher
+
+    def _invalidate(self, callers):
+        # drop cached matchers of the affected callers and their submodules
+        self.version += 1
+        callers = set(callers)
+        prefixes = tuple(x + "." for x in callers)
+
+        for caller in list(self._matchers):
+            if caller in callers or caller.startswith(prefixes):
+                del self._matchers[caller]
+
+    def _matchers_for(self, caller):
+        matchers = self._matchers.get(caller)
+
+        if matchers is None:
+            # the lock keeps the trie and the cache consistent
+            # while rules are being updated in another thread
+            with self._lock:
+                matchers = self._matchers[caller] = tuple(
+                    (node.module, node.data)
+                    for node in self._rules.path(caller)
+                )
+
+        return matchers
+
+    def freeze(self):
+        """
+        Finishes the warm-up of adaptive matchers, so evaluation
+        never writes to them afterwards.
+        """
+        with self._lock:
+            for node in self._rules.nodes():
+                node.data.freeze()
 
     def on_import_begin(self, import_info, stack, strict):
-        for caller_info in reversed(stack):
-            if not self.is_import_allowed(import_info, caller_info):
-                break
-        else:
+        violation = self.find_violation(import_info, stack)
+
+        if violation is None:
             return
 
+        caller_info, _ = violation
+
+        if self.on_violation is not None:
+            self.on_violation(import_info, caller_info)
+
         # avoid duplicated warnings
         key = (
             import_info.module_name,
@@ -88,15 +316,442 @@ class DefendingObserver(Observer):
         warnings.warn(message, ForbiddenImportWarning, stacklevel=4)
         self._seen_modules.add(key)
 
+    def find_violation(self, import_info, stack):
+        """
+        Returns (caller_info, rule) for the nearest caller in the stack
+        that is not allowed to import the module, or None.
+        """
+        for caller_info in reversed(stack):
+            rule = self.find_rule(import_info, caller_info)
+            if rule is not None:
+                return caller_info, rule
+
+    def find_rule(self, import_info, caller_info):
+        """
+        Returns the name of the first rule denying the import, or None.
+        """
+        for rule, matcher in self._matchers_for(caller_info.module_name):
+            if matcher.matches(import_info, caller_info):
+                return rule
+
     def is_import_allowed(self, import_info, caller_info):
-        caller = caller_info.module_name
+        return self.find_rule(import_info, caller_info) is None
 
-        for node in self._rules.path(caller):
-            if node.data.matches(import_info, caller_info):
-                return False
+    def find_ruled_caller(self, stack):
+        """
+        Returns the nearest caller in the stack that has rules, or None.
+        """
+        for caller_info in reversed(stack):
+            if self._matchers_for(caller_info.module_name):
+                return caller_info
 
-        return True
+    def check_group(self, caller_info, imports):
+        """
+        Checks many imports made by the same caller.
+        Returns a bytearray with 1 for allowed and 0 for denied imports.
+        """
+        allowed = bytearray(b"\x01") * len(imports)
+        remaining = range(len(imports))
+
+        for _, matcher in self._matchers_for(caller_info.module_name):
+            denied = matcher.select(imports, caller_info, remaining)
+
+            if denied:
+                for i in denied:
+                    allowed[i] = 0
+
+                remaining = [i for i in remaining if allowed[i]]
+
+        return allowed
+
+
+class ReportingObserver(Observer):
+    def report(self):
+        raise NotImplementedError
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+class ProfilingObserver(ReportingObserver):
+    """
+    Collects self and cumulative import time (in microseconds) per module.
+    """
+
+    name = "profiler"
+    unit = "us"
+
+    def __init__(self):
+        self.modules = {}
+        # caller (see `get_caller`) -> [count, cumulative]
+        self.callers = {}
+        self._local = threading.local()
+
+    def measure(self):
+        return perf_counter() * 1e6
+
+    def get_caller(self, stack):
+        return stack[-1].module_name
+
+    def on_import_begin(self, import_info, stack, strict):
+        frames = getattr(self._local, "frames", None)
+        if frames is None:
+            frames = self._local.frames = []
+
+        # [start, accumulated cumulative value of nested imports]
+        frames.append([self.measure(), 0])
+
+    def on_import_end(self, import_info, stack, strict):
+        frames = self._local.frames
+        start, nested = frames.pop()
+        cumulative = self.measure() - start
+
+        if frames:
+            frames[-1][1] += cumulative
+
+        stats = self.modules.get(import_info.module_name)
+        if stats is None:
+            stats = self.modules[import_info.module_name] = [0, 0, 0]
+
+        stats[0] += 1
+        stats[1] += cumulative - nested
+        stats[2] += cumulative
+
+        if stack:
+            caller = self.get_caller(stack)
+            stats = self.callers.get(caller)
+            if stats is None:
+                stats = self.callers[caller] = [0, 0]
+
+            stats[0] += 1
+            stats[1] += cumulative
+
+    def report(self):
+        modules = [
+            {
+                "module": name,
+                "count": count,
+                "self": int(self_value),
+                "cumulative": int(cumulative),
+            }
+            for name, (count, self_value, cumulative) in self.modules.items()
+        ]
+        modules.sort(key=lambda x: x["cumulative"], reverse=True)
+
+        callers = [
+            {"caller": name, "count": count, "cumulative": int(cumulative)}
+            for name, (count, cumulative) in self.callers.items()
+        ]
+        callers.sort(key=lambda x: x["cumulative"], reverse=True)
+
+        return {"unit": self.unit, "modules": modules, "callers": callers}
+
+
+def _get_rss_function():
+    """
+    Returns a function returning the resident set size of the process
+    in bytes (the peak value on systems without /proc), or None.
+    """
+    if os.path.exists("/proc/self/statm"):
+        page_size = os.sysconf("SC_PAGE_SIZE")
+
+        def rss():
+            # opened every time, /proc/self is resolved on open (fork)
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * page_size
+
+        return rss
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    # kilobytes, but bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+
+    def rss():
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    return rss
+
+
+class MemoryObserver(ProfilingObserver):
+    """
+    Collects self and cumulative memory (in bytes) taken by imports
+    per module.
+
+    By default it's the growth of the resident set size of the process
+    (or of its peak on systems without /proc), which is cheap but has
+    the granularity of memory pages and includes memory of C extensions.
+
+    `tracing=True` counts memory allocated by Python and still held
+    after import using `tracemalloc` instead. Tracing slows down every
+    allocation in the process (not only during imports), so it's opt-in.
+    `snapshots=True` (implies tracing) also takes snapshots around
+    the first import of every module and keeps its `limit` largest
+    allocation sites. Tracing is stopped by `close` if it was started
+    by the observer.
+
+    The counters are process-wide, so imports running concurrently
+    in other threads are attributed to each other.
+
+    Imports are charged to the nearest caller returned by `ruled_caller`
+    (e.g. the nearest caller with deny rules), or to the nearest caller
+    if it returns None.
+    """
+
+    name = "memory"
+    unit = "B"
+
+    def __init__(
+        self, snapshots=False, limit=10, ruled_caller=None, tracing=False
+    ):
+        super(MemoryObserver, self).__init__()
+        self.snapshots = snapshots
+        self.limit = limit
+        self.ruled_caller = ruled_caller
+        # module -> [(allocation site, size), ...]
+        self.allocations = {}
+        self._tracemalloc = None
+        self._started = False
+        self._rss = None
+
+        if not (tracing or snapshots):
+            self._rss = _get_rss_function()
+
+        if self._rss is None:
+            # imported here: imports inside the observer's callbacks
+            # would go through the import hook again
+            import tracemalloc
+
+            self._tracemalloc = tracemalloc
+            self._started = not tracemalloc.is_tracing()
+
+            if self._started:
+                tracemalloc.start()
+
+    def close(self):
+        if self._started:
+            self._tracemalloc.stop()
+            self._started = False
+
+    def measure(self):
+        if self._rss is not None:
+            return self._rss()
+
+        return self._tracemalloc.get_traced_memory()[0]
+
+    def get_caller(self, stack):
+        if self.ruled_caller is not None:
+            caller_info = self.ruled_caller(stack)
+            if caller_info is not None:
+                return caller_info.module_name
+
+        return stack[-1].module_name
+
+    def on_import_begin(self, import_info, stack, strict):
+        if self.snapshots:
+            snapshot = None
+            if import_info.module_name not in sys.modules:
+                snapshot = self._tracemalloc.take_snapshot()
+
+            pending = getattr(self._local, "snapshots", None)
+            if pending is None:
+                pending = self._local.snapshots = []
+
+            pending.append(snapshot)
+
+        super(MemoryObserver, self).on_import_begin(
+            import_info, stack, strict
+        )
+
+    def on_import_end(self, import_info, stack, strict):
+        super(MemoryObserver, self).on_import_end(import_info, stack, strict)
+
+        if not self.snapshots:
+            return
+
+        before = self._local.snapshots.pop()
+        if before is None:
+            return
+
+        diff = self._tracemalloc.take_snapshot().compare_to(
+            before, "lineno"
+        )
+        self.allocations[import_info.module_name] = [
+            (str(x.traceback), x.size_diff)
+            for x in diff[: self.limit]
+            if x.size_diff > 0
+        ]
+
+    def report(self):
+        report = super(MemoryObserver, self).report()
+
+        if self.snapshots:
+            report["allocations"] = {
+                module: [{"site": site, "size": size} for site, size in sites]
+                for module, sites in self.allocations.items()
+            }
+
+        return report
+
+
+def _is_loaded(module):
+    spec = getattr(module, "__spec__", None)
+    return module is not None and not getattr(spec, "_initializing", False)
+
+
+def _loading_module_name(import_info):
+    """
+    Returns the name of the module (or of the first submodule from
+    `from_list`) that is not loaded yet, or None.
+    """
+    name = import_info.module_name
+    module = sys.modules.get(name)
+
+    if not _is_loaded(module):
+        return name
+
+    if not import_info.from_list or not hasattr(module, "__path__"):
+        return None
+
+    for item in import_info.from_list:
+        if item == "*" or item in module.__dict__:
+            continue
+
+        submodule = "{}.{}".format(name, item)
+        if not _is_loaded(sys.modules.get(submodule)):
+            return submodule
+
+
+class _LoadStartFinder(object):
+    """
+    Never finds anything, only reports that the import system started
+    looking for a module (the module lock is already acquired by then).
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def find_spec(self, fullname, path=None, target=None):
+        self.callback()
+
+    def find_module(self, fullname, path=None):  # Python 2
+        self.callback()
+
+
+class ImportLockObserver(ReportingObserver):
+    """
+    Splits the time (in microseconds) of every import of a module that is
+    not loaded yet into the wait for the import lock and the loading.
+
+    If the module is loaded by another thread meanwhile, the whole import
+    is spent waiting. Waits are also attributed to threads and callers.
+
+    `from package import submodule` with the package already loaded is
+    charged to the first submodule in the list that is not loaded yet.
+
+    Modules being loaded by another thread can only be told apart on
+    Python 3.4+ (`__spec__._initializing`), older versions count them
+    as loaded.
+    """
+
+    name = "locks"
+    unit = "us"
+
+    def __init__(self):
+        # module -> [count, wait, load]
+        self.modules = {}
+        # module -> {thread name: wait}
+        self.threads = {}
+        # module -> {caller: wait}
+        self.callers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._finder = _LoadStartFinder(self._on_load_start)
+        sys.meta_path.insert(0, self._finder)
+
+    def close(self):
+        sys.meta_path.remove(self._finder)
+
+    def on_import_begin(self, import_info, stack, strict):
+        pending = getattr(self._local, "pending", None)
+        if pending is None:
+            pending = self._local.pending = []
+
+        name = _loading_module_name(import_info)
+
+        if name is None:
+            # already imported, no locks are involved
+            pending.append(None)
+        else:
+            # [start, start of loading, module]
+            pending.append([perf_counter(), None, name])
+
+    def _on_load_start(self):
+        pending = getattr(self._local, "pending", None)
+
+        if pending and pending[-1] is not None and pending[-1][1] is None:
+            pending[-1][1] = perf_counter()
+
+    def on_import_end(self, import_info, stack, strict):
+        times = self._local.pending.pop()
+        if times is None:
+            return
+
+        end = perf_counter()
+        start, load_start, name = times
+
+        if load_start is None:
+            wait, load = end - start, 0
+        else:
+            wait, load = load_start - start, end - load_start
+
+        wait, load = wait * 1e6, load * 1e6
+        thread = threading.current_thread().name
+        caller = stack[-1].module_name if stack else None
+
+        with self._lock:
+            stats = self.modules.get(name)
+            if stats is None:
+                stats = self.modules[name] = [0, 0, 0]
+                self.threads[name] = {}
+                self.callers[name] = {}
+
+            stats[0] += 1
+            stats[1] += wait
+            stats[2] += load
+
+            threads = self.threads[name]
+            threads[thread] = threads.get(thread, 0) + wait
+
+            callers = self.callers[name]
+            callers[caller] = callers.get(caller, 0) + wait
+
+    def report(self):
+        with self._lock:
+            modules = [
+                {
+                    "module": name,
+                    "count": count,
+                    "wait": int(wait),
+                    "load": int(load),
+                    "threads": {
+                        k: int(v)
+                        for k, v in self.threads[name].items()
+                        if v >= 1
+                    },
+                    "callers": {
+                        k: int(v)
+                        for k, v in self.callers[name].items()
+                        if v >= 1
+                    },
+                }
+                for name, (count, wait, load) in self.modules.items()
+            ]
 
+        modules.sort(key=lambda x: x["wait"], reverse=True)
 
-# class ProfilingObserver(Observer):
-#     name = "profiler"
+        return {"unit": self.unit, "modules": modules}
@@ -0,0 +1,229 @@
+"""
+pytest plugin.
+
+Enables deny rules for the whole session and charges the first import
+of every module (and every violation) to the test or the collected module
+that triggered it. Results of pytest-xdist workers are merged on the
+controller.
+
+    pytest --import-guard [--import-guard-rules rules.toml]
+        [--import-guard-strict] [--import-guard-top 10]
+
+or in the ini file:
+
+    [pytest]
+    import_guard_rules = rules.toml
+"""
+
+import os
+import threading
+from time import perf_counter
+
+import _pytest
+import pluggy
+import pytest
+
+from ._guard import guard
+from .config import load_rules
+from .observers import Observer, _loading_module_name
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("import_guard")
+    group.addoption(
+        "--import-guard",
+        action="store_true",
+        help="attribute first imports and forbidden imports to tests",
+    )
+    group.addoption(
+        "--import-guard-rules",
+        metavar="PATH",
+        help="deny rules (.toml or .py), enables the plugin",
+    )
+    group.addoption(
+        "--import-guard-strict",
+        action="store_true",
+        help="raise ForbiddenImportError instead of warning",
+    )
+    group.addoption(
+        "--import-guard-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="number of tests and imports per test in the report",
+    )
+    parser.addini("import_guard_rules", "deny rules (.toml or .py)")
+    parser.addini("import_guard_strict", "strict mode", type="bool")
+
+
+def pytest_configure(config):
+    rules = config.getoption("import_guard_rules") or config.getini(
+        "import_guard_rules"
+    )
+
+    if not (rules or config.getoption("import_guard")):
+        return
+
+    strict = config.getoption("import_guard_strict") or config.getini(
+        "import_guard_strict"
+    )
+    config.pluginmanager.register(
+        ImportGuardPlugin(config, rules, strict), "import_guard_session"
+    )
+
+
+class PytestObserver(Observer):
+    """
+    Charges the time of first imports to the current test. Nested imports
+    are included into the time of the outermost one.
+    """
+
+    name = "pytest"
+
+    def __init__(self):
+        self.current = "<session>"
+        # nodeid -> {"imports": {module: seconds}, "violations": [...]}
+        self.tests = {}
+        self._local = threading.local()
+
+    def _stats(self, nodeid):
+        stats = self.tests.get(nodeid)
+        if stats is None:
+            stats = self.tests[nodeid] = {"imports": {}, "violations": []}
+
+        return stats
+
+    def on_import_begin(self, import_info, stack, strict):
+        local = self._local
+        pending = getattr(local, "pending", None)
+        if pending is None:
+            pending = local.pending = []
+            local.measuring = False
+
+        # `from package import submodule` is charged to the submodule
+        name = None if local.measuring else _loading_module_name(import_info)
+
+        if name is None:
+            pending.append(None)
+        else:
+            local.measuring = True
+            pending.append((perf_counter(), name))
+
+    def on_import_end(self, import_info, stack, strict):
+        pending = self._local.pending.pop()
+        if pending is None:
+            return
+
+        start, name = pending
+        self._local.measuring = False
+        imports = self._stats(self.current)["imports"]
+        imports[name] = imports.get(name, 0) + perf_counter() - start
+
+    def on_violation(self, import_info, caller_info):
+        violation = "{} from {}".format(
+            import_info.module_name, caller_info.module_name
+        )
+        violations = self._stats(self.current)["violations"]
+
+        if violation not in violations:
+            violations.append(violation)
+
+    def merge(self, tests):
+        for nodeid, data in tests.items():
+            stats = self._stats(nodeid)
+
+            for module, elapsed in data["imports"].items():
+                stats["imports"][module] = (
+                    stats["imports"].get(module, 0) + elapsed
+                )
+
+            for violation in data["violations"]:
+                if violation not in stats["violations"]:
+                    stats["violations"].append(violation)
+
+
+class ImportGuardPlugin(object):
+    def __init__(self, config, rules, strict):
+        self.config = config
+        self.observer = PytestObserver()
+
+        if rules:
+            guard.set_deny_rules(load_rules(rules))
+
+        guard.register(self.observer)
+        guard.on_violation = self.observer.on_violation
+
+        # test modules, test functions and fixtures are called by pytest
+        # (through pluggy), so their frames are the outermost ones
+        boundaries = [
+            os.path.dirname(x.__file__) + os.sep for x in (_pytest, pluggy)
+        ]
+        guard.enable(strict=strict, entrypoints=[], boundaries=boundaries)
+
+    def pytest_unconfigure(self, config):
+        guard.disable()
+        guard.on_violation = None
+
+    def pytest_collectstart(self, collector):
+        self.observer.current = collector.nodeid or "<session>"
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        self.observer.current = item.nodeid
+        yield
+        self.observer.current = "<session>"
+
+    def pytest_sessionfinish(self, session):
+        workeroutput = getattr(session.config, "workeroutput", None)
+        if workeroutput is not None:
+            # pytest-xdist worker
+            workeroutput["import_guard"] = self.observer.tests
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_testnodedown(self, node, error):
+        # pytest-xdist controller
+        output = getattr(node, "workeroutput", {})
+        self.observer.merge(output.get("import_guard", {}))
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if hasattr(self.config, "workeroutput"):
+            return
+
+        top = self.config.getoption("import_guard_top")
+        tests = sorted(
+            self.observer.tests.items(),
+            key=lambda x: sum(x[1]["imports"].values()),
+            reverse=True,
+        )
+
+        terminalreporter.write_sep("=", "import guard: slowest first imports")
+
+        for nodeid, stats in tests[:top]:
+            imports = sorted(
+                stats["imports"].items(), key=lambda x: x[1], reverse=True
+            )
+            if not imports:
+                continue
+
+            terminalreporter.write_line(
+                "{:10.1f}ms {}".format(
+                    sum(stats["imports"].values()) * 1000, nodeid
+                )
+            )
+
+            for module, elapsed in imports[:top]:
+                terminalreporter.write_line(
+                    "{:14.1f}ms {}".format(elapsed * 1000, module)
+                )
+
+        violations = [(nodeid, x["violations"]) for nodeid, x in tests]
+        violations = [x for x in violations if x[1]]
+
+        if violations:
+            terminalreporter.write_sep("=", "import guard: forbidden imports")
+
+        for nodeid, items in sorted(violations):
+            terminalreporter.write_line(nodeid)
+
+            for violation in items:
+                terminalreporter.write_line("    " + violation)
@@ -23,8 +23,8 @@ class Trie:
         prefix = ""
 
         for submodule in module_name.split("."):
+            prefix += "." + submodule if prefix else submodule
             if submodule not in current.children:
-                prefix += "." + submodule if prefix else submodule
                 current.children[submodule] = Node(prefix)
             current = current.children[submodule]
 
@@ -34,6 +34,33 @@ class Trie:
         for key, data in data_dict.items():
             self.insert(key, data)
 
+    def remove(self, module_name):
+        """
+        Removes the data of the given module and prunes nodes
+        that are left empty. Returns True if the module existed.
+        """
+        nodes = [self.root]
+        for submodule in module_name.split("."):
+            if submodule not in nodes[-1].children:
+                return False
+            nodes.append(nodes[-1].children[submodule])
+
+        if nodes[-1].data is _missing:
+            return False
+
+        nodes[-1].data = _missing
+
+        for submodule, parent, node in zip(
+            reversed(module_name.split(".")),
+            reversed(nodes[:-1]),
+            reversed(nodes[1:]),
+        ):
+            if node.data is not _missing or node.children:
+                break
+            del parent.children[submodule]
+
+        return True
+
     def find(self, module_name):
         """
         Returns the Node representing the given module if it exists
@@ -65,6 +92,14 @@ class Trie:
 
         return path
 
+    def nodes(self):
+        """
+        Returns a list of all nodes with data.
+        """
+        nodes = []
+        self._submodules_for(self.root, nodes)
+        return nodes
+
     def starts_with(self, prefix):
         """
         Returns a list of all nodes beginning with the given prefix, or
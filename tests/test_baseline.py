@@ -0,0 +1,115 @@
+import inspect
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+
+from import_guard import guard
+from import_guard.baseline import Baseline, BaselineRecorder, write_baseline
+from import_guard.models import CallerInfo, ImportInfo
+
+
+@unittest.skipIf(sys.version_info < (3, 3), "requires Python 3.3+")
+class TestBaseline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "edges.bin")
+
+    def tearDown(self):
+        guard.use_baseline(None)
+        shutil.rmtree(self.tmp)
+
+    def test_write_and_read(self):
+        edges = {
+            ("test_proj.api", False, "csv"),
+            ("test_proj.api", True, "test_proj.tasks"),
+            ("__main__", False, "test_proj"),
+        }
+        write_baseline(self.path, edges)
+
+        baseline = Baseline(self.path)
+        try:
+            self.assertEqual(len(baseline), 3)
+
+            for edge in edges:
+                self.assertIn(edge, baseline)
+
+            self.assertNotIn(("test_proj.api", True, "csv"), baseline)
+            self.assertNotIn(("test_proj.api", False, "json"), baseline)
+            self.assertNotIn(("test_proj.core", False, "csv"), baseline)
+        finally:
+            baseline.close()
+
+    def test_empty_baseline(self):
+        write_baseline(self.path, set())
+
+        baseline = Baseline(self.path)
+        self.assertNotIn(("test_proj.api", False, "csv"), baseline)
+        baseline.close()
+
+    def test_recorder(self):
+        recorder = BaselineRecorder()
+        stack = [
+            CallerInfo("__main__", "<module>", "main.py", 1, 1),
+            CallerInfo("test_proj.api", "<lazy run>", "api.py", 2, 0),
+        ]
+        recorder.on_import_begin(ImportInfo("csv", [], 0), stack, False)
+
+        self.assertEqual(recorder.edges, {("test_proj.api", True, "csv")})
+
+    def test_known_edges_skip_rules(self):
+        guard.enable()
+        self.addCleanup(guard.disable)
+        caller, is_lazy = CallerInfo.edge(
+            inspect.currentframe(), guard.entrypoints
+        )
+        write_baseline(self.path, {(caller, is_lazy, "bisect")})
+
+        guard.set_deny_rules({caller: ["bisect", "string"]})
+        guard.use_baseline(self.path)
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            import bisect  # noqa:F401
+            import string  # noqa:F401
+
+        self.assertEqual(len(w), 1)
+        self.assertIn("Importing `string`", str(w[0].message))
+
+    def test_denied_edges_are_not_recorded(self):
+        guard.enable()
+        self.addCleanup(guard.disable)
+        caller, is_lazy = CallerInfo.edge(
+            inspect.currentframe(), guard.entrypoints
+        )
+
+        guard.set_deny_rules({caller: "bisect"})
+        recorder = BaselineRecorder(guard._find_violation)
+        guard.register(recorder)
+        self.addCleanup(guard._observers.pop, recorder.name)
+
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter("always")
+            import bisect  # noqa:F401
+            import string  # noqa:F401
+
+        self.assertIn((caller, is_lazy, "string"), recorder.edges)
+        self.assertNotIn((caller, is_lazy, "bisect"), recorder.edges)
+
+        recorder.save(self.path)
+        guard.set_deny_rules({caller: ["bisect", "string"]})
+        guard.use_baseline(self.path)
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            import bisect  # noqa:F401,F811
+            import string  # noqa:F401,F811
+
+        self.assertEqual(len(w), 1)
+        self.assertIn("Importing `bisect`", str(w[0].message))
+
+
+if __name__ == "__main__":
+    unittest.main()
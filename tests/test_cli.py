@@ -0,0 +1,116 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from import_guard.config import toml
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """\
+import sys
+import csv
+
+
+def handler():
+    import json
+
+
+handler()
+print(" ".join(sys.argv[1:]))
+"""
+
+RULES = """\
+[rules]
+"__main__" = [{top_level = "csv"}, {explicit = "re"}]
+"""
+
+RULES_PY = """\
+from import_guard import mod
+
+rules = {"__main__": [mod.top_level("csv"), mod.explicit("re")]}
+"""
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "requires Python 3.5+")
+class TestRunCommand(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        with open(os.path.join(self.tmp, "app.py"), "w") as f:
+            f.write(SCRIPT)
+
+        with open(os.path.join(self.tmp, "rules.toml"), "w") as f:
+            f.write(RULES)
+
+        with open(os.path.join(self.tmp, "rules.py"), "w") as f:
+            f.write(RULES_PY)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_guard(self, *args):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, self.tmp]))
+        return subprocess.run(
+            [sys.executable, "-m", "import_guard", "run"] + list(args),
+            cwd=self.tmp,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+
+    @unittest.skipIf(toml is None, "requires Python 3.11+ or tomli")
+    def test_run_script(self):
+        result = self.run_guard("--rules", "rules.toml", "app.py", "-x", "1")
+
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, "-x 1\n")
+        self.assertIn("Importing `csv` from `__main__`", result.stderr)
+        self.assertNotIn("Importing `re`", result.stderr)
+
+    def test_run_module_strict(self):
+        result = self.run_guard(
+            "--rules", "rules.py", "--strict", "-m", "app"
+        )
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ForbiddenImportError", result.stderr)
+
+    def test_profile(self):
+        result = self.run_guard("--profile", "out.json", "app.py")
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        with open(os.path.join(self.tmp, "out.json")) as f:
+            report = json.load(f)
+
+        modules = {x["module"]: x for x in report["modules"]}
+        self.assertEqual(report["unit"], "us")
+        self.assertIn("csv", modules)
+        self.assertGreaterEqual(
+            modules["csv"]["cumulative"], modules["csv"]["self"]
+        )
+
+    def test_memory(self):
+        result = self.run_guard(
+            "--memory", "out.json", "--memory-snapshots", "app.py"
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        with open(os.path.join(self.tmp, "out.json")) as f:
+            report = json.load(f)
+
+        modules = {x["module"]: x for x in report["modules"]}
+        callers = {x["caller"]: x for x in report["callers"]}
+        self.assertEqual(report["unit"], "B")
+        self.assertGreater(modules["csv"]["cumulative"], 0)
+        self.assertIn("__main__", callers)
+        self.assertTrue(report["allocations"]["csv"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+from import_guard import mod
+from import_guard.importtime import check, iter_imports
+
+
+LOG = """\
+Some unrelated stderr output
+import time: self [us] | cumulative | imported package
+import time:        88 |         88 |     _sre
+import time:       205 |        205 |     copyreg
+import time:       668 |        961 |   re
+import time:       285 |        285 |   _csv
+import time:       536 |       1782 | csv
+import time:       100 |        100 | json
+""".splitlines(True)
+
+
+class TestImportTime(unittest.TestCase):
+    def test_iter_imports(self):
+        records = list(iter_imports(LOG))
+
+        self.assertEqual(
+            [x.import_info.module_name for x in records],
+            ["csv", "re", "_sre", "copyreg", "_csv", "json"],
+        )
+
+        copyreg = records[3]
+        self.assertEqual(
+            [(x.module_name, x.depth) for x in copyreg.stack],
+            [("__main__", 2), ("csv", 1), ("re", 0)],
+        )
+        self.assertEqual((copyreg.self, copyreg.cumulative), (205, 205))
+
+    def test_check(self):
+        report = check(
+            LOG,
+            {
+                "__main__": [mod.explicit("json"), mod.matches("_?sre")],
+                "csv": "copyreg",
+            },
+        )
+
+        self.assertEqual(
+            [(x["module"], x["caller"]) for x in report["violations"]],
+            [("_sre", "__main__"), ("copyreg", "csv"), ("json", "__main__")],
+        )
+        self.assertEqual(
+            report["rules"],
+            [
+                {"rule": "csv", "count": 1, "cumulative": 205},
+                {"rule": "__main__", "count": 2, "cumulative": 188},
+            ],
+        )
+
+    def test_nested_violations_are_charged_once(self):
+        report = check(LOG, {"__main__": mod.matches("(re|_sre)$")})
+
+        self.assertEqual(len(report["violations"]), 2)
+        self.assertEqual(
+            report["rules"],
+            [{"rule": "__main__", "count": 1, "cumulative": 961}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
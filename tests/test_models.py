@@ -0,0 +1,80 @@
+import inspect
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from import_guard.models import CallerInfo
+
+
+class TestCallerResolution(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.files = {}
+
+        for name in [
+            "ig_pkg/__init__.py",
+            "ig_pkg/api/__init__.py",
+            "ig_pkg/api/views.py",
+            "ig_mod.py",
+        ]:
+            path = os.path.join(self.tmp, *name.split("/"))
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+            open(path, "w").close()
+            self.files[name] = path
+
+        sys.path.insert(0, self.tmp)
+
+    def tearDown(self):
+        sys.path.remove(self.tmp)
+        shutil.rmtree(self.tmp)
+
+    @unittest.skipIf(sys.version_info < (3, 4), "requires module specs")
+    def test_resolve_by_path(self):
+        CallerInfo.register_prefixes(["ig_pkg.api", "ig_mod", "ig_missing"])
+
+        # ruled modules are not imported
+        self.assertNotIn("ig_pkg", sys.modules)
+        self.assertNotIn("ig_mod", sys.modules)
+
+        expected = {
+            "ig_pkg/api/__init__.py": "ig_pkg.api",
+            "ig_pkg/api/views.py": "ig_pkg.api.views",
+            "ig_mod.py": "ig_mod",
+        }
+        for name, module_name in expected.items():
+            self.assertEqual(
+                CallerInfo.get_module_name(self.files[name]), module_name
+            )
+
+        # outside of ruled packages
+        path = self.files["ig_pkg/__init__.py"]
+        self.assertEqual(CallerInfo.get_module_name(path), path)
+
+        # unresolved filenames are resolved again when rules change
+        CallerInfo.register_prefixes(["ig_pkg"])
+        self.assertEqual(CallerInfo.get_module_name(path), "ig_pkg")
+
+
+class TestStack(unittest.TestCase):
+    def test_boundaries(self):
+        def caller():
+            return CallerInfo.stack(
+                inspect.currentframe(), set(), (unittest_dir,)
+            )
+
+        unittest_dir = os.path.dirname(unittest.__file__) + os.sep
+        stack = caller()
+
+        # unwinding stops at the frame called by unittest
+        self.assertEqual(
+            [x.function for x in stack], ["test_boundaries", "<lazy caller>"]
+        )
+        self.assertEqual([x.depth for x in stack], [1, 0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,302 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from import_guard import guard
+from import_guard.models import CallerInfo, ImportInfo
+from import_guard.observers import (
+    DefendingObserver,
+    MemoryObserver,
+    Observer,
+    ProfilingObserver,
+    TracingObserver,
+)
+
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+try:
+    from StringIO import StringIO  # Python 2
+except ImportError:
+    from io import StringIO
+
+
+class FakeProfiler(ProfilingObserver):
+    def __init__(self, values):
+        super(FakeProfiler, self).__init__()
+        self.values = iter(values)
+
+    def measure(self):
+        return next(self.values)
+
+
+def stack(module_name):
+    return [CallerInfo(module_name, "<module>", "main.py", 1, 0)]
+
+
+class TestProfilingObserver(unittest.TestCase):
+    def test_self_and_cumulative(self):
+        profiler = FakeProfiler([0, 10, 40, 100])
+        csv, re = ImportInfo("csv", [], 0), ImportInfo("re", [], 0)
+
+        profiler.on_import_begin(csv, stack("__main__"), False)
+        profiler.on_import_begin(re, stack("csv"), False)
+        profiler.on_import_end(re, stack("csv"), False)
+        profiler.on_import_end(csv, stack("__main__"), False)
+
+        report = profiler.report()
+        self.assertEqual(
+            report["modules"],
+            [
+                {"module": "csv", "count": 1, "self": 70, "cumulative": 100},
+                {"module": "re", "count": 1, "self": 30, "cumulative": 30},
+            ],
+        )
+        self.assertEqual(
+            report["callers"],
+            [
+                {"caller": "__main__", "count": 1, "cumulative": 100},
+                {"caller": "csv", "count": 1, "cumulative": 30},
+            ],
+        )
+
+
+class TestMemoryObserver(unittest.TestCase):
+    @unittest.skipIf(tracemalloc is None, "requires tracemalloc")
+    def test_allocations(self):
+        profiler = MemoryObserver(snapshots=True)
+        self.addCleanup(profiler.close)
+        import_info = ImportInfo("not_imported_module", [], 0)
+
+        profiler.on_import_begin(import_info, stack("__main__"), False)
+        data = [bytearray(1024) for _ in range(100)]
+        profiler.on_import_end(import_info, stack("__main__"), False)
+
+        report = profiler.report()
+        (stats,) = report["modules"]
+        self.assertEqual(report["unit"], "B")
+        self.assertGreaterEqual(stats["self"], 100 * 1024)
+        self.assertEqual(stats["self"], stats["cumulative"])
+        self.assertTrue(report["allocations"]["not_imported_module"])
+        del data
+
+    def test_ruled_caller(self):
+        defender = DefendingObserver({"test_proj.api": "csv"})
+        profiler = MemoryObserver(ruled_caller=defender.find_ruled_caller)
+        self.addCleanup(profiler.close)
+
+        api, utils = stack("test_proj.api.views"), stack("test_proj.utils")
+        re = ImportInfo("re", [], 0)
+
+        profiler.on_import_begin(re, api + utils, False)
+        profiler.on_import_end(re, api + utils, False)
+        profiler.on_import_begin(re, utils, False)
+        profiler.on_import_end(re, utils, False)
+
+        self.assertEqual(
+            sorted(x["caller"] for x in profiler.report()["callers"]),
+            ["test_proj.api.views", "test_proj.utils"],
+        )
+
+    @unittest.skipIf(tracemalloc is None, "requires tracemalloc")
+    def test_resident_memory(self):
+        was_tracing = tracemalloc.is_tracing()
+        profiler = MemoryObserver()
+        import_info = ImportInfo("not_imported_module", [], 0)
+
+        # no tracing by default
+        self.assertEqual(tracemalloc.is_tracing(), was_tracing)
+
+        profiler.on_import_begin(import_info, stack("__main__"), False)
+        data = b"x" * (32 << 20)
+        profiler.on_import_end(import_info, stack("__main__"), False)
+
+        (stats,) = profiler.report()["modules"]
+        self.assertGreaterEqual(stats["self"], 16 << 20)
+        del data
+
+    @unittest.skipIf(tracemalloc is None, "requires tracemalloc")
+    def test_close(self):
+        was_tracing = tracemalloc.is_tracing()
+        MemoryObserver(tracing=True).close()
+        self.assertEqual(tracemalloc.is_tracing(), was_tracing)
+
+
+class TestTracingObserver(unittest.TestCase):
+    def trace(self, tracer):
+        csv, re = ImportInfo("csv", [], 0), ImportInfo("re", [], 0)
+        lazy_stack = [CallerInfo("csv", "<lazy f>", "csv.py", 1, 0)]
+
+        tracer.on_import_begin(csv, stack("__main__"), False)
+        tracer.on_import_begin(re, lazy_stack, False)
+        tracer.on_import_end(re, lazy_stack, False)
+        tracer.on_import_end(csv, stack("__main__"), False)
+        tracer.close()
+
+    def test_text(self):
+        output = StringIO()
+        self.trace(TracingObserver(output))
+
+        # skip timestamps
+        lines = [x[11:] for x in output.getvalue().splitlines()]
+        self.assertEqual(
+            lines, [" > csv", "   > re (lazy)", "   < re (lazy)", " < csv"]
+        )
+
+    def test_ndjson(self):
+        output = StringIO()
+        self.trace(TracingObserver(output, "ndjson"))
+
+        records = [json.loads(x) for x in output.getvalue().splitlines()]
+        self.assertEqual(
+            [(x["event"], x["module"], x["depth"]) for x in records],
+            [("begin", "csv", 0), ("begin", "re", 1)]
+            + [("end", "re", 1), ("end", "csv", 0)],
+        )
+        self.assertEqual(records[1]["caller"], "csv")
+        self.assertTrue(records[1]["lazy"])
+        self.assertFalse(records[0]["lazy"])
+
+    def test_filters(self):
+        output = StringIO()
+        self.trace(TracingObserver(output, callers=["csv"]))
+        self.assertEqual(len(output.getvalue().splitlines()), 2)
+
+        output = StringIO()
+        self.trace(TracingObserver(output, modules=["cs"]))
+        self.assertEqual(output.getvalue(), "")
+
+    def test_buffering(self):
+        output = StringIO()
+        tracer = TracingObserver(output, buffer_size=3)
+        csv = ImportInfo("csv", [], 0)
+
+        tracer.on_import_begin(csv, stack("__main__"), False)
+        tracer.on_import_end(csv, stack("__main__"), False)
+        self.assertEqual(output.getvalue(), "")
+
+        tracer.on_import_begin(csv, stack("__main__"), False)
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+        tracer.on_import_end(csv, stack("__main__"), False)
+        tracer.close()
+        self.assertEqual(len(output.getvalue().splitlines()), 4)
+
+    def test_threads(self):
+        output = StringIO()
+        tracer = TracingObserver(output, buffer_size=7)
+        csv = ImportInfo("csv", [], 0)
+
+        def trace():
+            for _ in range(1000):
+                tracer.on_import_begin(csv, stack("__main__"), False)
+                tracer.on_import_end(csv, stack("__main__"), False)
+
+        threads = [threading.Thread(target=trace) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        tracer.close()
+        self.assertEqual(len(output.getvalue().splitlines()), 16000)
+
+
+class TestImportLockObserver(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp, "ig_slow_pkg"))
+
+        for name in ["ig_slow_module.py", "ig_slow_pkg/sub.py"]:
+            with open(os.path.join(self.tmp, name), "w") as f:
+                f.write("import time\ntime.sleep(0.2)\n")
+
+        open(os.path.join(self.tmp, "ig_slow_pkg", "__init__.py"), "w").close()
+
+        sys.path.insert(0, self.tmp)
+        self.observer = guard.profile_locks()
+        guard.enable()
+
+    def tearDown(self):
+        guard.disable()
+        del guard._observers[self.observer.name]
+        self.observer.close()
+        sys.path.remove(self.tmp)
+        for name in ["ig_slow_module", "ig_slow_pkg", "ig_slow_pkg.sub"]:
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.tmp)
+
+    def run_threads(self, load, module):
+        loader = threading.Thread(target=load, name="loader")
+        waiter = threading.Thread(target=load, name="waiter")
+
+        loader.start()
+        time.sleep(0.05)
+        waiter.start()
+        loader.join()
+        waiter.join()
+
+        (stats,) = [
+            x
+            for x in self.observer.report()["modules"]
+            if x["module"] == module
+        ]
+
+        # timings are relative, runners may be slow
+        self.assertEqual(stats["count"], 2)
+        self.assertGreater(stats["load"], 0)
+        self.assertGreater(stats["wait"], 0)
+        self.assertGreater(
+            stats["threads"]["waiter"], stats["threads"].get("loader", 0)
+        )
+
+    @unittest.skipIf(sys.version_info < (3, 4), "requires module specs")
+    def test_wait_and_load(self):
+        def load():
+            import ig_slow_module  # noqa:F401
+
+        self.run_threads(load, "ig_slow_module")
+
+    def test_other_observers_are_not_measured(self):
+        class SlowObserver(Observer):
+            name = "slow"
+
+            def on_import_begin(self, import_info, stack, strict):
+                time.sleep(0.05)
+
+            def on_import_end(self, import_info, stack, strict):
+                time.sleep(0.05)
+
+        guard.register(SlowObserver())
+        self.addCleanup(guard._observers.pop, "slow")
+        self.assertEqual(list(guard._observers)[-1], self.observer.name)
+
+        import ig_slow_module  # noqa:F401
+
+        (stats,) = [
+            x
+            for x in self.observer.report()["modules"]
+            if x["module"] == "ig_slow_module"
+        ]
+        # no contention, the wait would be at least the sleep otherwise
+        self.assertLess(stats["wait"], 50000)
+
+    @unittest.skipIf(sys.version_info < (3, 4), "requires module specs")
+    def test_submodule_of_loaded_package(self):
+        import ig_slow_pkg  # noqa:F401
+
+        def load():
+            from ig_slow_pkg import sub  # noqa:F401
+
+        self.run_threads(load, "ig_slow_pkg.sub")
+
+
+if __name__ == "__main__":
+    unittest.main()
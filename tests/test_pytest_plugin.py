@@ -0,0 +1,167 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from import_guard.models import find_spec
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TESTS = """\
+import bisect
+
+import ig_plugin_pkg
+
+
+def test_lazy_import():
+    import ig_plugin_sample
+
+    assert ig_plugin_sample.VALUE == 1
+
+
+def test_cached_import():
+    import ig_plugin_sample  # noqa:F401
+
+
+def test_submodule_import():
+    from ig_plugin_pkg import sub  # noqa:F401
+"""
+
+SAMPLE = """\
+import time
+
+time.sleep(0.05)
+VALUE = 1
+"""
+
+RULES = """\
+[rules]
+"test_sample" = {top_level = ["bisect", "ig_plugin_sample"]}
+"""
+
+# runs in a subprocess, pytest can't be imported by the test suite
+MERGE = """\
+import json
+from types import SimpleNamespace
+
+from import_guard.pytest_plugin import ImportGuardPlugin, PytestObserver
+
+worker = ImportGuardPlugin.__new__(ImportGuardPlugin)
+worker.observer = PytestObserver()
+worker.observer.tests = {
+    "test_a": {"imports": {"json": 0.5}, "violations": ["csv from a"]},
+}
+config = SimpleNamespace(workeroutput={})
+worker.pytest_sessionfinish(SimpleNamespace(config=config))
+
+controller = ImportGuardPlugin.__new__(ImportGuardPlugin)
+controller.observer = PytestObserver()
+controller.observer.tests = {
+    "test_a": {"imports": {"json": 0.25}, "violations": ["re from a"]},
+}
+node = SimpleNamespace(workeroutput=config.workeroutput)
+controller.pytest_testnodedown(node, None)
+controller.pytest_testnodedown(node, None)
+controller.pytest_testnodedown(SimpleNamespace(), None)
+print(json.dumps(controller.observer.tests))
+"""
+
+
+@unittest.skipIf(find_spec("pytest") is None, "pytest is not installed")
+class TestPytestPlugin(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+        files = {
+            "test_sample.py": TESTS,
+            "ig_plugin_sample.py": SAMPLE,
+            "ig_plugin_pkg/__init__.py": "",
+            "ig_plugin_pkg/sub.py": SAMPLE,
+            "rules.toml": RULES,
+        }
+        os.mkdir(os.path.join(self.tmp, "ig_plugin_pkg"))
+        for name, content in files.items():
+            with open(os.path.join(self.tmp, name), "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def run_pytest(self, *args):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, self.tmp]))
+        return subprocess.run(
+            [sys.executable, "-m", "pytest", "-p", "no:cacheprovider"]
+            + ["-p", "import_guard.pytest_plugin"]
+            + list(args),
+            cwd=self.tmp,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+
+    def test_disabled_by_default(self):
+        result = self.run_pytest()
+
+        self.assertEqual(result.returncode, 0, result.stdout)
+        self.assertNotIn("import guard", result.stdout)
+
+    def test_report(self):
+        result = self.run_pytest("--import-guard-rules", "rules.toml")
+        self.assertEqual(result.returncode, 0, result.stdout)
+
+        lines = result.stdout.splitlines()
+        start = next(
+            i for i, x in enumerate(lines) if "slowest first imports" in x
+        )
+        report = lines[start:]
+
+        test_line = next(x for x in report if "test_lazy_import" in x)
+        module_line = report[report.index(test_line) + 1]
+        self.assertIn("ig_plugin_sample", module_line)
+        self.assertGreaterEqual(float(module_line.split("ms")[0]), 50)
+        self.assertFalse(any("test_cached_import" in x for x in report[:-3]))
+
+        # the package is already imported by the test module
+        test_line = next(x for x in report if "test_submodule_import" in x)
+        module_line = report[report.index(test_line) + 1]
+        self.assertIn("ig_plugin_pkg.sub", module_line)
+        self.assertGreaterEqual(float(module_line.split("ms")[0]), 50)
+
+        self.assertIn("import guard: forbidden imports", result.stdout)
+        # top level import in the test module
+        self.assertIn("    bisect from test_sample", result.stdout)
+        # lazy import in the test function
+        self.assertNotIn("ig_plugin_sample from", result.stdout)
+
+    def test_strict(self):
+        result = self.run_pytest(
+            "--import-guard-rules", "rules.toml", "--import-guard-strict"
+        )
+
+        self.assertNotEqual(result.returncode, 0)
+        self.assertIn("ForbiddenImportError", result.stdout)
+
+    def test_merge_worker_results(self):
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        output = subprocess.check_output(
+            [sys.executable, "-c", MERGE], env=env, universal_newlines=True
+        )
+
+        self.assertEqual(
+            json.loads(output),
+            {
+                "test_a": {
+                    "imports": {"json": 1.25},
+                    "violations": ["re from a", "csv from a"],
+                }
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,10 @@
+import sys
+import threading
+import time
 import unittest
 
 from import_guard import guard, mod
+from import_guard.matchers import Exact
 from import_guard.models import ImportInfo
 
 
@@ -108,6 +112,203 @@ class TestRules(unittest.TestCase):
             "test_proj.tasks", caller="test_proj.api", top_level=False
         )
 
+    def test_check_many(self):
+        guard.set_deny_rules(
+            {
+                "test_proj": "csv",
+                "test_proj.api": [mod.top_level("test_proj.tasks"), "bisect"],
+            }
+        )
+
+        pairs = [
+            ("csv", "test_proj.api"),
+            ("logging", "test_proj.api"),
+            ("test_proj.tasks", "test_proj.api"),
+            ("csv", "test_proj.api"),
+            ("bisect", "test_proj.core"),
+            ("csv", "other"),
+            (ImportInfo("bisect", ["bisect_left"], 0), "test_proj.api"),
+        ]
+        expected = bytearray(
+            guard.is_import_allowed(*pair) for pair in pairs
+        )
+
+        assert guard.check_many(pairs) == expected == bytearray(
+            [0, 1, 0, 0, 1, 1, 0]
+        )
+        assert guard.check_many(pairs, processes=2) == expected
+        assert guard.check_many(pairs, top_level=False)[2] == 1
+
+    def test_incremental_updates(self):
+        guard.set_deny_rules({"test_proj": "csv"})
+        defender = guard._observers["defender"]
+        version = defender.version
+
+        assert not guard.is_import_allowed("csv", caller="test_proj.api")
+        assert guard.is_import_allowed("json", caller="test_proj.api")
+
+        guard.add_rules({"test_proj.api": "json", "test_proj": "bisect"})
+        assert guard._observers["defender"] is defender
+        assert defender.version > version
+
+        assert not guard.is_import_allowed("json", caller="test_proj.api")
+        assert not guard.is_import_allowed("csv", caller="test_proj.api")
+        assert not guard.is_import_allowed("bisect", caller="test_proj.core")
+        assert guard.is_import_allowed("json", caller="test_proj.core")
+
+        guard.replace_rule("test_proj", "logging")
+        assert guard.is_import_allowed("csv", caller="test_proj.api")
+        assert not guard.is_import_allowed("logging", caller="test_proj.api")
+
+        guard.remove_rules(["test_proj.api"])
+        assert guard.is_import_allowed("json", caller="test_proj.api")
+        assert not guard.is_import_allowed("logging", caller="test_proj.api")
+
+    def test_update_invalidates_only_affected_callers(self):
+        guard.set_deny_rules({"test_proj": "csv", "other": "csv"})
+        defender = guard._observers["defender"]
+
+        for caller in ["test_proj.api", "test_proj_2", "other"]:
+            guard.is_import_allowed("csv", caller=caller)
+
+        guard.add_rules({"test_proj": "json"})
+        assert set(defender._matchers) == {"test_proj_2", "other"}
+
+    def test_adaptive_matchers(self):
+        calls = []
+
+        def rarely_matches(import_info, caller_info):
+            calls.append(import_info.module_name)
+            return import_info.module_name == "json"
+
+        def side_effect(import_info, caller_info):
+            calls.append(None)
+            return False
+
+        cheap = Exact("csv")
+        expensive = mod.hook(rarely_matches, pure=True)
+        impure = mod.hook(side_effect)
+        rule = mod.any([expensive, impure, "io", cheap])
+
+        guard.set_deny_rules({"<stdin>": rule}, adaptive=10)
+
+        for _ in range(10):
+            assert not guard.is_import_allowed("csv")
+
+        assert not guard.is_import_allowed("json")
+        # pure matchers are not moved across impure ones
+        assert rule.matchers[:2] == [expensive, impure]
+        assert rule.matchers[2] is cheap
+
+        del calls[:]
+        assert not guard.is_import_allowed("csv")
+        assert guard.is_import_allowed("bisect")
+        assert calls == ["csv", None, "bisect", None]
+
+    def test_adaptive_all(self):
+        rule = mod.all([mod.hook(lambda *args: True, pure=True), "csv"])
+        rule.adapt(warmup=5)
+
+        for _ in range(5):
+            assert not rule.test("json")
+
+        assert isinstance(rule.matchers[0], Exact)
+        assert rule.test("csv")
+
+    def test_adaptive_short_circuit(self):
+        calls = []
+
+        def never_after_csv(import_info, caller_info):
+            calls.append(import_info.module_name)
+            return False
+
+        rule = mod.any(
+            ["csv", mod.star("x"), mod.hook(never_after_csv, pure=True)]
+        )
+        guard.set_deny_rules({"<stdin>": rule}, adaptive=10)
+
+        for _ in range(10):
+            assert not guard.is_import_allowed("csv")
+
+        # children after the decisive one are not evaluated
+        assert calls == []
+        assert isinstance(rule.matchers[0], Exact)
+        assert guard.is_import_allowed("json")
+        assert calls == ["json"]
+
+    @unittest.skipIf(
+        not hasattr(sys, "getswitchinterval"), "requires sys.setswitchinterval"
+    )
+    def test_adaptive_threads(self):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+        errors = []
+
+        def check():
+            try:
+                for _ in range(20):
+                    assert not rule.test("csv")
+                    assert rule.test("json")
+            except Exception as e:
+                errors.append(e)
+
+        # switches threads in the middle of the evaluation
+        switch = mod.hook(lambda *args: time.sleep(0), pure=True)
+
+        for _ in range(100):
+            rule = mod.any([switch, "io", mod.matches("js.*"), "json"])
+            rule.adapt(warmup=8)
+
+            threads = [threading.Thread(target=check) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            assert errors == []
+            assert rule._stats is None
+            assert len(rule.matchers) == 4
+
+    def test_adaptive_straggler(self):
+        rule = mod.any(["io", mod.matches("js.*"), "json"]).adapt(warmup=2)
+        state = rule._stats
+        args = (ImportInfo.from_string("json"), None)
+
+        assert rule.matches(*args)
+        assert rule.matches(*args)
+        assert rule._stats is None
+        order = rule.matchers
+
+        # an evaluation that started before the reordering finishes
+        # with the old order and doesn't reorder again
+        assert rule._observe(state, args)
+        assert rule.matchers is order
+
+    def test_freeze(self):
+        guard.set_deny_rules(
+            {
+                "test_proj": mod.any(["csv", "bisect"]),
+                "test_proj.api": "json",
+            },
+            adaptive=100,
+        )
+        defender = guard._observers["defender"]
+        assert not guard.is_import_allowed("bisect", caller="test_proj.api")
+
+        defender.freeze()
+
+        rule = defender._rules.find("test_proj").data
+        assert rule._stats is None
+        assert isinstance(rule.matchers, tuple)
+        assert not guard.is_import_allowed("bisect", caller="test_proj.api")
+        assert not guard.is_import_allowed("json", caller="test_proj.api.v1")
+        assert guard.is_import_allowed("json", caller="test_proj.core")
+
+        guard.add_rules({"test_proj.api": "logging"})
+        assert not guard.is_import_allowed("logging", caller="test_proj.api")
+        assert guard.is_import_allowed("logging", caller="test_proj.core")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -44,3 +44,26 @@ class TestTrie(unittest.TestCase):
     def test_find_longer_path(self):
         path = self.trie.path("test_proj.api.views.auth.login")
         assert [x.data for x in path] == [1, 2, 3]
+
+    def test_module_names(self):
+        path = self.trie.path("test_proj.api.views")
+        assert [x.module for x in path] == [
+            "test_proj",
+            "test_proj.api",
+            "test_proj.api.views",
+        ]
+
+    def test_remove(self):
+        assert self.trie.remove("test_proj.api.views")
+        assert self.trie.find("test_proj.api.views") is None
+        assert self.trie.size() == 3
+
+        assert self.trie.remove("test_proj")
+        assert self.trie.find("test_proj") is None
+        assert [x.data for x in self.trie.path("test_proj.api")] == [2]
+        assert self.trie.size() == 3
+
+    def test_remove_not_exists(self):
+        assert not self.trie.remove("test_proj.models")
+        assert not self.trie.remove("test_proj.api.views.auth")
+        assert self.trie.size() == 4